@@ -1,6 +1,13 @@
+import hashlib
+import json
+import math
+import os
+import re
 import requests
+import numpy as np
 import pandas as pd
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # ---------------------------------------
 # CONFIG
@@ -12,7 +19,24 @@ OVERPASS_URLS = [
 ]
 
 OUTPUT_FILE = "location_dictionary_merged.xlsx"
-SLEEP_BETWEEN_QUERIES = 10  
+SLEEP_BETWEEN_QUERIES = 10  # only after a real download (cache hits don't wait)
+
+# on-disk response cache: <CACHE_DIR>/<sha256(query)>.json
+CACHE_DIR = "overpass_cache"
+CACHE_MAX_AGE = 7 * 24 * 3600  # seconds; older responses are downloaded again
+
+# large bbox queries are split into TILE_DEG x TILE_DEG sub-boxes
+# and fetched MAX_CONCURRENT at a time (Overpass gives ~2 slots per IP)
+TILE_DEG = 0.1
+MAX_CONCURRENT = 2
+DOWNLOAD_CHUNK = 1 << 16
+
+# near-duplicate merging: same/similar names closer than MERGE_DISTANCE_KM
+# become one place; same-named places further apart stay separate
+MERGE_DISTANCE_KM = 3.0
+NAME_SIMILARITY = 0.85  # 2 * LCS / (len a + len b) for spelling variants
+NAME_LENGTH_DIFF = 2    # variants differ in length by at most this many characters
+EARTH_RADIUS_KM = 6371.0
 
 # ---------------------------------------
 # OVERPASS QUERIES
@@ -46,35 +70,131 @@ QUERIES = {
     "bus_stop": """
     [out:json][timeout:120];
     (
-    node["highway"="bus_stop"](47.80,106.70,48.05,107.05);
-    way["highway"="bus_stop"](47.80,106.70,48.05,107.05);
+    node["highway"="bus_stop"]({bbox});
+    way["highway"="bus_stop"]({bbox});
 
-    node["public_transport"="platform"](47.80,106.70,48.05,107.05);
-    way["public_transport"="platform"](47.80,106.70,48.05,107.05);
+    node["public_transport"="platform"]({bbox});
+    way["public_transport"="platform"]({bbox});
 
-    node["public_transport"="stop_position"](47.80,106.70,48.05,107.05);
+    node["public_transport"="stop_position"]({bbox});
 );
 out center tags;
     """
 }
 
+# queries with a {bbox} placeholder: (south, west, north, east)
+TILED_QUERIES = {
+    "bus_stop": (47.80, 106.70, 48.05, 107.05),
+}
+
+# ---------------------------------------
+# RESPONSE CACHE
+# ---------------------------------------
+def cache_path(query):
+    key = hashlib.sha256(query.strip().encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, key + ".json")
+
+
+def is_fresh(path, max_age=CACHE_MAX_AGE):
+    return os.path.exists(path) and time.time() - os.path.getmtime(path) < max_age
+
 # ---------------------------------------
 # FETCH FUNCTION (SAFE)
 # ---------------------------------------
 def fetch_overpass(query):
+    """
+    Returns the path of the cached response file. The body is streamed to
+    disk in chunks, so large responses are never held in memory.
+    """
+    path = cache_path(query)
+    if is_fresh(path):
+        print(f"🔹 Cache hit {os.path.basename(path)}")
+        return path
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+
     for url in OVERPASS_URLS:
         try:
             print(f"🔹 Querying {url}")
-            r = requests.post(url, data=query, timeout=300)
-            if r.status_code != 200:
-                print("HTTP error:", r.status_code)
-                continue
-            return r.json()
+            with requests.post(url, data=query, timeout=300, stream=True) as r:
+                if r.status_code != 200:
+                    print("HTTP error:", r.status_code)
+                    continue
+                with open(tmp, "wb") as f:
+                    for block in r.iter_content(DOWNLOAD_CHUNK):
+                        f.write(block)
+            os.replace(tmp, path)
+            time.sleep(SLEEP_BETWEEN_QUERIES)
+            return path
         except Exception as e:
             print("Error:", e)
+            if os.path.exists(tmp):
+                os.remove(tmp)
             continue
     raise RuntimeError(" All Overpass servers failed")
 
+
+def iter_elements(path):
+    """
+    Yields the response's "elements" one at a time (ijson if installed,
+    otherwise the whole file is loaded with json).
+    """
+    with open(path, "rb") as f:
+        try:
+            import ijson
+        except ImportError:
+            yield from json.load(f).get("elements", [])
+            return
+        yield from ijson.items(f, "elements.item", use_float=True)
+
+# ---------------------------------------
+# TILING
+# ---------------------------------------
+def tile_bbox(bbox, step=TILE_DEG):
+    south, west, north, east = bbox
+    # count tiles up front so float steps can't add a sliver tile at the edge
+    n_lat = max(1, math.ceil(round((north - south) / step, 6)))
+    n_lon = max(1, math.ceil(round((east - west) / step, 6)))
+    tiles = []
+    for i in range(n_lat):
+        for j in range(n_lon):
+            tiles.append((
+                round(south + i * step, 6), round(west + j * step, 6),
+                round(min(south + (i + 1) * step, north), 6), round(min(west + (j + 1) * step, east), 6)
+            ))
+    return tiles
+
+
+def fetch_tiled(query, bbox):
+    """
+    Fetches every tile (MAX_CONCURRENT at a time) and returns the cached
+    response paths in tile order.
+    """
+    queries = [
+        query.replace("{bbox}", ",".join(f"{v:.6f}" for v in tile))
+        for tile in tile_bbox(bbox)
+    ]
+    print(f"   {len(queries)} tiles")
+    with ThreadPoolExecutor(MAX_CONCURRENT) as pool:
+        return list(pool.map(fetch_overpass, queries))
+
+
+def iter_query_elements(name, query):
+    if name not in TILED_QUERIES:
+        yield from iter_elements(fetch_overpass(query))
+        return
+
+    # elements on a tile border come back from both tiles
+    seen = set()
+    for path in fetch_tiled(query, TILED_QUERIES[name]):
+        for el in iter_elements(path):
+            key = (el.get("type"), el.get("id"))
+            if key in seen:
+                continue
+            seen.add(key)
+            yield el
+
 # ---------------------------------------
 # PARSE ELEMENTS
 # ---------------------------------------
@@ -124,58 +244,321 @@ def parse_elements(elements):
     return rows
 
 # ---------------------------------------
-# MAIN PIPELINE
+# SPATIAL DEDUPLICATION
 # ---------------------------------------
-all_rows = []
+NON_WORD = re.compile(r"[\W_]+")
 
-for name, query in QUERIES.items():
-    print(f"\n Running query: {name}")
-    data = fetch_overpass(query)
-    elements = data.get("elements", [])
-    rows = parse_elements(elements)
-    print(f"   ➕ extracted rows: {len(rows)}")
-    all_rows.extend(rows)
-    time.sleep(SLEEP_BETWEEN_QUERIES)
 
-df = pd.DataFrame(all_rows)
+def name_key(names):
+    # "Хар-Хорин", "хар хорин" -> "хархорин"
+    # (python re: pandas' arrow-backed regex treats \W as ASCII-only)
+    # each distinct name is normalized once
+    codes, uniques = pd.factorize(names)
+    keys = np.array([NON_WORD.sub("", name.lower()) for name in uniques], dtype=object)
+    return pd.Series(keys[codes], index=names.index)
 
-print("\n Raw counts by type:")
-print(df["type"].value_counts())
 
-# ---------------------------------------
-# CLEANING
-# ---------------------------------------
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
 
-# remove junk like "1", "1-р байр"
-df = df[~df["canonical"].str.match(r"^\d+(-р)?$", na=False)]
 
-# normalize name for dedup
-df["norm_name"] = df["canonical"].str.lower().str.strip()
+def expand_runs(start, sizes):
+    # run n covers positions start[n] .. start[n] + sizes[n] - 1;
+    # returns (run number, position) for every covered position
+    run = np.repeat(np.arange(len(start)), sizes)
+    pos = np.arange(len(run)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    return run, pos + np.repeat(start, sizes)
 
-# ---------------------------------------
-# DEDUPLICATION (CANONICAL NAME LEVEL)
-# ---------------------------------------
-dedup_rows = []
 
-for name, g in df.groupby("norm_name"):
-    dedup_rows.append({
-        "raw_text": name,
-        "canonical": g.iloc[0]["canonical"],
-        "type": g.iloc[0]["type"],
-        "lat": g["lat"].mean(),
-        "lon": g["lon"].mean(),
-        "source": "osm",
-        "count": len(g)
-    })
+def block_pairs(left, right, shifts):
+    """
+    All index pairs (i, j) with right[j] == left[i] + shift for one of the
+    shifts: a sort-and-search join on packed int64 block keys, so a
+    neighbouring block is just the row's own key plus a constant.
+    """
+    order = np.argsort(right, kind="stable")
+    sorted_right = right[order]
+    # sorted queries walk sorted_right in order (much faster than random probes)
+    left_order = np.argsort(left, kind="stable")
+    sorted_left = left[left_order]
+    pairs_i, pairs_j = [], []
+    for shift in shifts:
+        start = np.searchsorted(sorted_right, sorted_left + shift, "left")
+        end = np.searchsorted(sorted_right, sorted_left + shift, "right")
+        i, pos = expand_runs(start, end - start)
+        pairs_i.append(left_order[i])
+        pairs_j.append(order[pos])
+    return np.concatenate(pairs_i), np.concatenate(pairs_j)
+
+
+def char_tables(keys):
+    """
+    Per key (at most 64 characters, the width of one position mask):
+    - signature: 8 one-byte character counters (character code mod 8)
+      packed into one uint64, for a cheap shared-character bound
+    - masks: per character, the bit mask of the positions where it occurs
+    Also returns the flat character codes and the key lengths.
+    """
+    lengths = np.array([len(key) for key in keys], dtype=np.int64)
+    codepoints = np.frombuffer("".join(keys).encode("utf-32-le"), dtype=np.uint32)
+    alphabet, chars = np.unique(codepoints, return_inverse=True)
+    owner, pos = expand_runs(np.zeros(len(keys), dtype=np.int64), lengths)
 
-final_df = pd.DataFrame(dedup_rows)
+    counts = np.bincount(owner * 8 + codepoints % 8, minlength=len(keys) * 8)
+    signature = counts.astype(np.uint8).view(np.uint64)
 
-print("\n After deduplication:")
-print(final_df["type"].value_counts())
-print("Total canonical locations:", len(final_df))
+    # positions within a key are distinct bits, so adding them is an OR
+    masks = np.zeros((len(keys), max(len(alphabet), 1)), dtype=np.uint64)
+    np.add.at(masks, (owner, chars), np.left_shift(np.uint64(1), pos.astype(np.uint64)))
+    return signature, masks, chars, lengths
+
+
+def shared_bound(signature, a, b):
+    # upper bound on the characters two keys share (difflib's quick_ratio,
+    # over the 8 folded counters): bytewise min, then the 8 bytes summed by
+    # one multiply into the top byte (the sum is <= 64, so nothing carries)
+    low = np.minimum(signature[a].view(np.uint8), signature[b].view(np.uint8))
+    total = low.view(np.uint64) * np.uint64(0x0101010101010101)
+    return (total >> np.uint64(56)).astype(np.int64)
+
+
+def lcs_lengths(masks, chars, lengths, a, b):
+    """
+    Longest common subsequence of keys a[n] and b[n] for all pairs at once
+    (bit-parallel LCS: bit p of v follows position p of the a key, one vector
+    step per character of the b key). The LCS is the number of zero bits
+    left in v.
+    """
+    offsets = np.cumsum(lengths) - lengths
+    v = np.full(len(a), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for t in range(lengths[b].max(initial=0)):
+        active = np.flatnonzero(lengths[b] > t)
+        u = v[active] & masks[a[active], chars[offsets[b[active]] + t]]
+        v[active] = (v[active] + u) | (v[active] - u)
+
+    # only the a key's own positions count (carries spill into the bits above)
+    la = lengths[a]
+    low = np.left_shift(np.uint64(1), np.minimum(la, 63).astype(np.uint64)) - np.uint64(1)
+    low[la >= 64] = np.iinfo(np.uint64).max
+    ones = np.unpackbits((v & low).view(np.uint8)).reshape(-1, 64).sum(axis=1)
+    return la - ones
+
+
+def lcs_length(a, b):
+    # plain dynamic programming, for the rare keys too long for one uint64
+    prev = [0] * (len(b) + 1)
+    for ca in a:
+        cur = [0]
+        for j, cb in enumerate(b):
+            cur.append(prev[j] + 1 if ca == cb else max(prev[j + 1], cur[j]))
+        prev = cur
+    return prev[-1]
+
+
+def similar_keys(keys, min_similarity, max_len_diff=NAME_LENGTH_DIFF):
+    """
+    Pairs (a, b) of distinct keys (indices into keys, each pair once) that
+    start with the same letter, differ in length by at most max_len_diff and
+    have a similarity 2 * LCS / (len a + len b) >= min_similarity.
+
+    Candidates come from (first letter, length) blocks. The shared-character
+    bound prunes them before the bit-parallel LCS; pairs with a key longer
+    than 64 characters go through lcs_length instead.
+    """
+    lengths = np.array([len(key) for key in keys], dtype=np.int64)
+    first = pd.factorize(pd.Series(keys, dtype=object).str[:1])[0].astype(np.int64)
+    block = first * (lengths.max(initial=0) + max_len_diff + 1) + lengths
+
+    # longer-or-equal partner only; within one block each pair once
+    a, b = block_pairs(block, block, range(max_len_diff + 1))
+    keep = (a < b) | (lengths[a] != lengths[b])
+    a, b = a[keep], b[keep]
+
+    # keys over 64 characters don't fit one position mask
+    long_a = long_b = np.empty(0, dtype=np.int64)
+    if lengths.max(initial=0) > 64:
+        long = (lengths[a] > 64) | (lengths[b] > 64)
+        long_a, long_b = a[long], b[long]
+        a, b = a[~long], b[~long]
+
+    signature, masks, chars, short_lengths = char_tables([key if len(key) <= 64 else "" for key in keys])
+
+    total = np.maximum(lengths[a] + lengths[b], 1)
+    keep = 2 * shared_bound(signature, a, b) / total >= min_similarity
+    a, b, total = a[keep], b[keep], total[keep]
+
+    keep = 2 * lcs_lengths(masks, chars, short_lengths, a, b) / total >= min_similarity
+    long_keep = np.array([
+        2 * lcs_length(keys[x], keys[y]) / (len(keys[x]) + len(keys[y])) >= min_similarity
+        for x, y in zip(long_a.tolist(), long_b.tolist())
+    ], dtype=bool)
+    return np.r_[a[keep], long_a[long_keep]], np.r_[b[keep], long_b[long_keep]]
+
+
+def candidate_pairs(lat, lon, key_codes, a, b, max_km):
+    """
+    Row pairs (i, j), each pair once, in the same or a neighbouring grid cell
+    whose keys are equal or one of the similar key pairs (a[n], b[n]). Cells
+    are at least max_km wide, so every such pair closer than max_km is among
+    them.
+    """
+    if not len(lat):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    max_abs_lat = np.abs(lat).max()
+    cell_deg = max_km / (111.0 * np.cos(np.radians(min(max_abs_lat, 89.0))))
+    cx = np.floor(lon / cell_deg).astype(np.int64)
+    cy = np.floor(lat / cell_deg).astype(np.int64)
+    # a free cell on each side, so a neighbour's key never wraps into the next row
+    cx = cx - cx.min() + 1
+    cy = cy - cy.min() + 1
+    n_y = cy.max() + 2
+    n_keys = key_codes.max() + 1
+
+    def pack(x, y, k):
+        return (x * n_y + y) * n_keys + k
+
+    # rows with key b[n] also stand in for key a[n], so one (cell, key) join
+    # finds equal and similar names alike
+    rows = np.arange(len(lat))
+    order = np.argsort(key_codes, kind="stable")
+    start = np.searchsorted(key_codes[order], np.arange(n_keys))
+    sizes = np.bincount(key_codes, minlength=n_keys)
+    alias, pos = expand_runs(start[b], sizes[b])
+    right_rows = np.r_[rows, order[pos]]
+    right_keys = np.r_[key_codes, a[alias]]
+
+    shifts = [pack(dx, dy, 0) - pack(0, 0, 0) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+    i, j = block_pairs(pack(cx, cy, key_codes), pack(cx[right_rows], cy[right_rows], right_keys), shifts)
+    # an equal-key pair is found from both ends, a similar-key pair only
+    # from its a side
+    keep = (i < right_rows[j]) | (j >= len(rows))
+    return i[keep], right_rows[j[keep]]
+
+
+def connected_components(n, i, j):
+    """
+    Component label per node for the edges (i, j): the smallest node id in
+    the component. Every round hooks each root onto the smallest label among
+    its edges, then pointer jumping flattens the trees; both steps are whole
+    array operations and the number of rounds grows with log(n).
+    """
+    labels = np.arange(n)
+    while True:
+        li, lj = labels[i], labels[j]
+        differ = li != lj
+        if not differ.any():
+            return labels
+        low = np.minimum(li[differ], lj[differ])
+        np.minimum.at(labels, li[differ], low)
+        np.minimum.at(labels, lj[differ], low)
+        while True:
+            up = labels[labels]
+            if (up == labels).all():
+                break
+            labels = up
+
+
+def cluster_places(df, max_km=MERGE_DISTANCE_KM, min_similarity=NAME_SIMILARITY):
+    """
+    Cluster label (int) per row: rows join when they are within max_km and
+    have the same name key or a name similarity >= min_similarity. Rows
+    without coordinates only merge with other coordinate-less rows of the
+    same key.
+    """
+    df = df.reset_index(drop=True)
+    keys = name_key(df["canonical"])
+    has_coord = df["lat"].notna() & df["lon"].notna()
+
+    loc = np.flatnonzero(has_coord.to_numpy())
+    lat = df["lat"].to_numpy(dtype=float)[loc]
+    lon = df["lon"].to_numpy(dtype=float)[loc]
+    key_codes, uniques = pd.factorize(keys.to_numpy()[loc])
+
+    # names are compared once per distinct key, distances only between rows
+    # whose names match
+    a, b = similar_keys(list(uniques), min_similarity)
+    i, j = candidate_pairs(lat, lon, key_codes, a, b, max_km)
+    close = haversine_km(lat[i], lon[i], lat[j], lon[j]) <= max_km
+
+    roots = connected_components(len(loc), i[close], j[close])
+
+    # coordinate-less rows get labels after the located ones, one per key
+    labels = np.empty(len(df), dtype=np.int64)
+    labels[loc] = roots
+    no_coord = np.flatnonzero(~has_coord.to_numpy())
+    labels[no_coord] = len(loc) + pd.factorize(keys.to_numpy()[no_coord])[0]
+    return labels
+
+
+def dedup_places(df, max_km=MERGE_DISTANCE_KM, min_similarity=NAME_SIMILARITY):
+    df = df.reset_index(drop=True)
+    df["cluster"] = cluster_places(df, max_km, min_similarity)
+
+    g = df.groupby("cluster", sort=False)
+    out = g.agg(
+        raw_text=("norm_name", "first"),
+        canonical=("canonical", "first"),
+        type=("type", "first"),
+        lat=("lat", "mean"),
+        lon=("lon", "mean"),
+        count=("canonical", "size"),
+    )
+    out.insert(5, "source", "osm")
+
+    # other spellings merged into the same place
+    # (a plain dict: a per-group ", ".join through pandas costs ~25 us a cluster)
+    extra = df.loc[df["canonical"] != g["canonical"].transform("first"), ["cluster", "canonical"]]
+    variants = {}
+    for cluster, name in extra.drop_duplicates().itertuples(index=False):
+        variants.setdefault(cluster, []).append(name)
+    out["variants"] = [", ".join(variants.get(cluster, ())) for cluster in out.index.tolist()]
+    return out.reset_index(drop=True)
 
 # ---------------------------------------
-# SAVE
+# MAIN PIPELINE
 # ---------------------------------------
-final_df.to_excel(OUTPUT_FILE, index=False)
-print(f"\n Saved: {OUTPUT_FILE}")
\ No newline at end of file
+# (guarded so the fetch/dedup functions can be imported without running it)
+if __name__ == "__main__":
+    all_rows = []
+
+    for name, query in QUERIES.items():
+        print(f"\n Running query: {name}")
+        rows = parse_elements(iter_query_elements(name, query))
+        print(f"   ➕ extracted rows: {len(rows)}")
+        all_rows.extend(rows)
+
+    df = pd.DataFrame(all_rows)
+
+    print("\n Raw counts by type:")
+    print(df["type"].value_counts())
+
+    # ---------------------------------------
+    # CLEANING
+    # ---------------------------------------
+
+    # remove junk like "1", "1-р байр"
+    df = df[~df["canonical"].str.match(r"^\d+(-р)?$", na=False)]
+
+    # normalize name for dedup
+    df["norm_name"] = df["canonical"].str.lower().str.strip()
+
+    # ---------------------------------------
+    # DEDUPLICATION (NAME + DISTANCE)
+    # ---------------------------------------
+    final_df = dedup_places(df)
+
+    print("\n After deduplication:")
+    print(final_df["type"].value_counts())
+    print("Total canonical locations:", len(final_df))
+
+    # ---------------------------------------
+    # SAVE
+    # ---------------------------------------
+    final_df.to_excel(OUTPUT_FILE, index=False)
+    print(f"\n Saved: {OUTPUT_FILE}")
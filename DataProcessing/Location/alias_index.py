@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import pickle
+import struct
+
+import match_key
+from alias_trie import compile_index
+from match_key import phrase_keys
+
+# =========================================================
+# ======================= CONFIG ===========================
+# =========================================================
+DICTIONARY_FILE = "location_dictionary.json"
+CONTEXT_FILE = "context.json"
+ARTIFACT_FILE = "location_index.bin"
+
+# Формат өөрчлөгдөх бүрт нэмэгдүүлнэ (хуучин artifact автоматаар дахин бүтээгдэнэ)
+ARTIFACT_VERSION = 5
+
+# Түлхүүрийг тодорхойлох код (FOLD, NUMBER_WORDS, ORDINAL_SUFFIXES хүснэгтүүд):
+# эдгээрийг засахад artifact-ийг hash-аар нь автоматаар дахин бүтээнэ
+KEY_SOURCES = [match_key.__file__]
+
+# Header: magic(6) + version(uint16) + sha256(32)
+MAGIC = b"LOCIDX"
+HEADER = struct.Struct("<6sH32s")
+
+# =========================================================
+# ================= ALIAS INDEX BUILD =====================
+# =========================================================
+def add_to_index(index, seen, phrase, info, fold=True, **extra):
+    """
+    seen: {(түлхүүр, canonical, type): item} - дуудалтуудын хооронд хуваалцана
+    extra: item-д нэмэх талбарууд (жишээ нь db.py-ийн alias_id)
+    Alias-ийг match_key-ийн түлхүүрээр хадгална: кирилл/латин, x/h гэх мэт
+    хувилбарууд нэг item болж, анхны бичлэгүүд нь "aliases"-д цугларна.
+    fold=False: үгсийг хөрвүүлэхгүй (db.py - make_engine(..., fold=False)-тэй хамт)
+    """
+    raw = " ".join(phrase.lower().split())
+    tokens = phrase_keys(raw.split()) if fold else raw.split()
+    if not tokens:
+        return
+
+    canonical = info["canonical"]
+    loc_type = info.get("type", "standard")
+    key = (tuple(tokens), canonical, loc_type)
+    item = seen.get(key)
+    if item is not None:
+        # постод яг бичигдсэнийг сонгоход (prefer_written)
+        if raw not in item["aliases"]:
+            item["aliases"].append(raw)
+        return
+
+    item = {
+        "full_alias_tokens": tokens,
+        "canonical": canonical,
+        "type": loc_type,
+        "length": len(tokens),
+        "aliases": [raw],
+        **extra
+    }
+    seen[key] = item
+    index.setdefault(tokens[0], []).append(item)
+
+
+def build_alias_index(location_dict):
+    index = {}
+    seen = {}
+    for loc in location_dict.values():
+        # excelToJson.py-ийн олон байршилд давхцсан alias-ууд: аль нэгийг нь
+        # таамаглахгүй, "common" мэт контекст шаардана
+        ambiguous = set(loc.get("ambiguous_aliases", ()))
+        common = {**loc, "type": "common"}
+        for alias in loc.get("aliases", []):
+            add_to_index(index, seen, alias, common if alias in ambiguous else loc)
+    return index
+
+
+def build_context_words(ctx):
+    # Бүх контекст үгсийг нэг багц болгох (постын үгстэй ижил түлхүүрээр)
+    return {
+        " ".join(phrase_keys(word.lower().split()))
+        for group in ctx["location_context"].values()
+        for word in group
+    }
+
+# =========================================================
+# ==================== ARTIFACT ============================
+# =========================================================
+def inputs_hash(*paths):
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        h.update(struct.pack("<Q", len(data)))
+        h.update(data)
+    return h.digest()
+
+
+def build_artifact(dictionary_file=DICTIONARY_FILE, context_file=CONTEXT_FILE,
+                   artifact_file=ARTIFACT_FILE):
+    """
+    Толь бичиг + context.json → хувилбартай binary artifact.
+    """
+    digest = inputs_hash(dictionary_file, context_file, *KEY_SOURCES)
+
+    with open(dictionary_file, encoding="utf-8") as f:
+        location_dict = json.load(f)
+    with open(context_file, encoding="utf-8") as f:
+        ctx = json.load(f)
+
+    index = build_alias_index(location_dict)
+    artifact = {
+        "index": index,
+        "compiled": compile_index(index),
+        "context": ctx,
+        "context_words": build_context_words(ctx),
+    }
+
+    # Хагас бичигдсэн файл үлдээхгүйн тулд түр файлд бичээд солино
+    tmp = artifact_file + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, ARTIFACT_VERSION, digest))
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, artifact_file)
+
+    return artifact
+
+
+def read_artifact(artifact_file, digest):
+    """
+    Header-ийг шалгаад индексийг файлаас шууд unpickle хийнэ.
+    Файл байхгүй, эсвэл header таарахгүй бол None.
+    """
+    if not os.path.exists(artifact_file):
+        return None
+
+    with open(artifact_file, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return None
+        magic, version, stored = HEADER.unpack(header)
+        if magic != MAGIC or version != ARTIFACT_VERSION or stored != digest:
+            return None
+        return pickle.load(f)
+
+
+def load_artifact(dictionary_file=DICTIONARY_FILE, context_file=CONTEXT_FILE,
+                  artifact_file=ARTIFACT_FILE):
+    """
+    Оролтын hash өөрчлөгдөөгүй бол бэлэн artifact-ийг ачаална,
+    эс бөгөөс дахин бүтээнэ.
+    """
+    digest = inputs_hash(dictionary_file, context_file, *KEY_SOURCES)
+    artifact = read_artifact(artifact_file, digest)
+    if artifact is None:
+        print("Alias индексийг дахин бүтээж байна...")
+        artifact = build_artifact(dictionary_file, context_file, artifact_file)
+    return artifact
+
+
+if __name__ == "__main__":
+    artifact = build_artifact()
+    n_aliases = sum(len(v) for v in artifact["index"].values())
+    print(f"{ARTIFACT_FILE}: {len(artifact['index'])} түлхүүр, {n_aliases} alias")
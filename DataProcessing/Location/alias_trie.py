@@ -0,0 +1,69 @@
+# =========================================================
+# ============ ALIAS PREFIX TRIE (FIRST WORD) ==============
+# =========================================================
+# optimized_index-ийн түлхүүрүүд (alias-ийн эхний үг)-ээр тэмдэгтийн
+# trie байгуулна. Текстийн нэг үгийг тэмдэгт тэмдэгтээр нэг удаа
+# алхахад тухайн үгийн эхлэл болж буй бүх түлхүүр олдох тул
+# индексийн хэмжээнээс биш, зөвхөн үгийн уртаас хамаарна.
+
+END = ""  # төгсгөлийн тэмдэг (жинхэнэ тэмдэгт "" байх боломжгүй)
+
+
+def compile_index(index):
+    """
+    {first_word: [item, ...]} индексийг trie болгон хөрвүүлэх.
+    Bucket бүрийг уртаар нь (урт нь эхэндээ) stable эрэмбэлнэ.
+    """
+    trie = {}
+    buckets = []
+
+    for order, (first_word, items) in enumerate(index.items()):
+        node = trie
+        for ch in first_word:
+            node = node.setdefault(ch, {})
+        node[END] = order
+        buckets.append(sorted(items, key=lambda x: x["length"], reverse=True))
+
+    return {"trie": trie, "buckets": buckets}
+
+
+def prefix_orders(compiled, token, max_suffix=None):
+    """
+    token-ий эхлэл болох түлхүүрүүдийн дарааллын дугаарууд.
+    max_suffix: түлхүүрийн араас зөвшөөрөх илүү тэмдэгтийн тоо (None = хязгааргүй)
+    """
+    found = []
+    node = compiled["trie"]
+    n = len(token)
+
+    for depth, ch in enumerate(token, 1):
+        node = node.get(ch)
+        if node is None:
+            break
+        if END in node and (max_suffix is None or n - depth <= max_suffix):
+            found.append(node[END])
+
+    return found
+
+
+def candidates(compiled, token, max_suffix=None):
+    """
+    token-д тохирох alias-ууд: үгийн тоогоор урт нь эхэндээ (greedy),
+    ижил бол token-д илүү урт тохирсон түлхүүр нь эхэндээ.
+    """
+    orders = prefix_orders(compiled, token, max_suffix)
+    if not orders:
+        return []
+
+    buckets = compiled["buckets"]
+    if len(orders) == 1:
+        return buckets[orders[0]]
+
+    # match_key-ээр нэгтгэсэн түлхүүрүүд бие биеийн угтвар болох нь элбэг
+    # ("hot" / "hotol"), тиймээс гүн түлхүүрээс нь эхлэн нийлүүлээд уртаар
+    # stable эрэмбэлнэ
+    merged = []
+    for order in reversed(orders):
+        merged.extend(buckets[order])
+    merged.sort(key=lambda x: x["length"], reverse=True)
+    return merged
@@ -1,6 +1,12 @@
+import argparse
+import json
+import os
+from datetime import datetime
+
 import pyodbc
-import re
-from collections import defaultdict
+
+from alias_index import add_to_index
+from location_engine import make_engine, normalize, match_batch, match_locations as engine_match
 
 # ======================================================
 # ================= DB CONNECTION ======================
@@ -19,10 +25,33 @@ conn_str = (
     f"PWD={password}"
 )
 
+WORKERS = None  # тааруулах процессын тоо (None = бүх цөм, 1 = serial)
+BATCH_SIZE = 5000  # нэг удаад татах, тааруулах, commit хийх постын тоо
+
+# Боловсруулах хүмүүс, анхны ажиллуулалтын эхлэх огноо
+PERSON_IDS = ['7c354d80-70e5-419f-b36c-193e0f4601fb']
+START_TIME = '2026-01-16'
+
+# Хүн бүрийн хамгийн сүүлд боловсруулсан (UpdateTime, PostID)
+CHECKPOINT_FILE = "db_checkpoint.json"
+
+parser = argparse.ArgumentParser(description="Постуудад байршил тааруулж Content.Post руу бичих")
+parser.add_argument(
+    "--full", action="store_true",
+    help="checkpoint-ийг үл тоон START_TIME-аас бүгдийг дахин тааруулах"
+)
+args = parser.parse_args()
+
+# Бичих холболт: batch бүрийн төгсгөлд commit хийнэ
 conn = pyodbc.connect(conn_str)
 cursor = conn.cursor()
+cursor.fast_executemany = True
 conn.autocommit = False
 
+# Унших холболт: постуудыг fetchmany-гаар урсгалаар татна.
+# Тусдаа session тул бичих талын commit уншилтыг тасалдуулахгүй.
+read_conn = pyodbc.connect(conn_str, autocommit=True)
+
 # ======================================================
 # ================= CONTEXT WORDS ======================
 # ======================================================
@@ -34,17 +63,6 @@ context_words = {
     "юм","уу","esvel","эсвэл"
 }
 
-# ======================================================
-# ================= NORMALIZE ==========================
-# ======================================================
-
-def normalize(text):
-    if not text:
-        return ""
-    text = text.lower()
-    text = re.sub(r"[^\w\s]", " ", text)
-    return re.sub(r"\s+", " ", text).strip()
-
 # ======================================================
 # ================= LOAD ALIASES =======================
 # ======================================================
@@ -66,117 +84,181 @@ def load_alias_index():
         WHERE a.Level = 6
     """)
 
-    index = defaultdict(list)
+    index = {}
+    seen = {}
 
     for row in cursor.fetchall():
-        alias_tokens = normalize(row.AliasText).split()
-        if not alias_tokens:
-            continue
-
-        index[alias_tokens[0]].append({
-            "alias_id": row.AliasID,
-            "canonical_id": row.CanonicalID,
-            "alias_tokens": alias_tokens,
-            "location_type": row.LocationType,
-            "length": len(alias_tokens)
-        })
+        add_to_index(
+            index, seen, normalize(row.AliasText),
+            {"canonical": row.CanonicalID, "type": row.LocationType},
+            fold=False, alias_id=row.AliasID
+        )
 
     return index
 
-alias_index = load_alias_index()
+# Үгс яг тэнцүү байх (exact) бодлого. Alias бүр өөрийн AliasID-тай тул
+# match_key-ээр нэгтгэхгүй - MatchContentID-д яг таарсан alias бичигдэнэ.
+engine = make_engine(load_alias_index(), context_words, "exact", fold=False)
 
 # ======================================================
 # ================= MATCH LOGIC ========================
 # ======================================================
 
-def match_locations(text):
-    tokens = normalize(text).split()
-    found = []
-
-    i = 0
-    n = len(tokens)
-
-    while i < n:
-        token = tokens[i]
-        candidates = []
-
-        for k in alias_index:
-            if token.startswith(k):
-                candidates.extend(alias_index[k])
-
-        candidates.sort(key=lambda x: x["length"], reverse=True)
+def match_locations(text, engine):
+    return [
+        {
+            "canonical_id": m["item"]["canonical"],
+            "alias_id": m["item"]["alias_id"]
+        }
+        for m in engine_match(text, engine)
+    ]
 
-        matched = False
-        for c in candidates:
-            m = c["length"]
-            if i + m > n:
-                continue
-
-            if tokens[i:i+m] != c["alias_tokens"]:
-                continue
+# ======================================================
+# ================= CHECKPOINT =========================
+# ======================================================
 
-            found.append({
-                "canonical_id": c["canonical_id"],
-                "alias_id": c["alias_id"]
-            })
-            i += m
-            matched = True
-            break
+def load_checkpoints():
+    if not os.path.exists(CHECKPOINT_FILE):
+        return {}
+    with open(CHECKPOINT_FILE, encoding="utf-8") as f:
+        return json.load(f)
 
-        if not matched:
-            i += 1
 
-    return found
+def save_checkpoint(checkpoints, person_id, post):
+    """
+    Commit хийсэн batch-ийн сүүлчийн постыг тэмдэглэнэ.
+    Commit-ийн дараа бичдэг тул унтарвал тухайн batch дахин
+    боловсруулагдах боловч MERGE давхардал үүсгэхгүй.
+    """
+    checkpoints[person_id] = {
+        "update_time": post.UpdateTime.isoformat(),
+        "post_id": str(post.PostID)
+    }
+    tmp = CHECKPOINT_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoints, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, CHECKPOINT_FILE)
 
 # ======================================================
 # ================= LOAD POSTS =========================
 # ======================================================
 
-def load_posts():
-    cursor.execute("""
-        SELECT p.ID AS PostID, p.Content
-        FROM dbo.Facebook.Posts p
-        JOIN Facebook.Post.Person per ON p.ID = per.PostID
-        WHERE per.PersonID = ?
-          AND p.UpdateTime > ?
-        ORDER BY p.UpdateTime DESC
-    """, '7c354d80-70e5-419f-b36c-193e0f4601fb', '2026-01-16')
-
-    return cursor.fetchall()
+def iter_post_batches(person_id, checkpoint=None, batch_size=BATCH_SIZE):
+    """
+    Checkpoint-оос хойш шинэ/шинэчлэгдсэн постуудыг (UpdateTime, ID)
+    дарааллаар, бүгдийг нь санах ойд ачаалахгүйгээр batch-аар буцаана
+    """
+    post_cursor = read_conn.cursor()
+    try:
+        if checkpoint:
+            since = datetime.fromisoformat(checkpoint["update_time"])
+            post_cursor.execute("""
+                SELECT p.ID AS PostID, p.Content, p.UpdateTime
+                FROM dbo.Facebook.Posts p
+                JOIN Facebook.Post.Person per ON p.ID = per.PostID
+                WHERE per.PersonID = ?
+                  AND (p.UpdateTime > ? OR (p.UpdateTime = ? AND p.ID > ?))
+                ORDER BY p.UpdateTime, p.ID
+            """, person_id, since, since, checkpoint["post_id"])
+        else:
+            post_cursor.execute("""
+                SELECT p.ID AS PostID, p.Content, p.UpdateTime
+                FROM dbo.Facebook.Posts p
+                JOIN Facebook.Post.Person per ON p.ID = per.PostID
+                WHERE per.PersonID = ?
+                  AND p.UpdateTime > ?
+                ORDER BY p.UpdateTime, p.ID
+            """, person_id, START_TIME)
+
+        while True:
+            posts = post_cursor.fetchmany(batch_size)
+            if not posts:
+                break
+            yield posts
+    finally:
+        post_cursor.close()
 
 # ======================================================
 # ================= INSERT RESULT ======================
 # ======================================================
 
-def insert_content_post(post_id, canonical_id, alias_id):
+def create_staging_table():
+    """
+    Session-ий түр хүснэгт (баганын төрлийг Content.Post-оос хуулна)
+    """
     cursor.execute("""
-        IF NOT EXISTS (
-            SELECT 1 FROM dbo.Social.Content.Post
-            WHERE PostID = ? AND ContentID = ? AND MatchContentID = ?
-        )
-        INSERT INTO dbo.Social.Content.Post
-        (ID, PostID, ContentID, MatchContentID, IsChecked, RegisteredDate)
-        VALUES (NEWID(), ?, ?, ?, 0, GETDATE())
-    """, post_id, canonical_id, alias_id)
+        SELECT TOP 0 PostID, ContentID, MatchContentID
+        INTO #ContentPostStage
+        FROM dbo.Social.Content.Post
+    """)
+
+
+def merge_content_posts(rows):
+    """
+    rows: [(post_id, canonical_id, alias_id), ...]
+    Түр хүснэгт рүү fast_executemany-гаар ачаалаад нэг MERGE-ээр
+    байхгүй холбоосуудыг л нэмнэ (мөр бүрийн IF NOT EXISTS-ийн оронд).
+    Нэмэгдсэн мөрийн тоог буцаана.
+    """
+    if not rows:
+        return 0
+
+    cursor.execute("TRUNCATE TABLE #ContentPostStage")
+    cursor.executemany("""
+        INSERT INTO #ContentPostStage (PostID, ContentID, MatchContentID)
+        VALUES (?, ?, ?)
+    """, rows)
+
+    cursor.execute("""
+        MERGE dbo.Social.Content.Post WITH (HOLDLOCK) AS t
+        USING (
+            SELECT DISTINCT PostID, ContentID, MatchContentID
+            FROM #ContentPostStage
+        ) AS s
+        ON t.PostID = s.PostID
+           AND t.ContentID = s.ContentID
+           AND t.MatchContentID = s.MatchContentID
+        WHEN NOT MATCHED THEN
+            INSERT (ID, PostID, ContentID, MatchContentID, IsChecked, RegisteredDate)
+            VALUES (NEWID(), s.PostID, s.ContentID, s.MatchContentID, 0, GETDATE());
+    """)
+    return cursor.rowcount
 
 # ======================================================
 # ================= MAIN PIPELINE ======================
 # ======================================================
 
 try:
-    posts = load_posts()
+    create_staging_table()
+    conn.commit()
 
-    for post in posts:
-        matches = match_locations(post.Content)
+    checkpoints = {} if args.full else load_checkpoints()
+    if args.full:
+        print(f" Бүрэн дахин тааруулалт ({START_TIME}-аас)")
 
-        for m in matches:
-            insert_content_post(
-                post.PostID,
-                m["canonical_id"],
-                m["alias_id"]
+    for person_id in PERSON_IDS:
+        total_posts = 0
+        total_inserted = 0
+
+        for posts in iter_post_batches(person_id, checkpoints.get(person_id)):
+            post_matches = match_batch(
+                [post.Content for post in posts], engine, func=match_locations, workers=WORKERS
             )
 
-    conn.commit()
+            rows = [
+                (post.PostID, m["canonical_id"], m["alias_id"])
+                for post, matches in zip(posts, post_matches)
+                for m in matches
+            ]
+
+            # Batch бүрийг тусад нь commit хийж, түгжээг удаан барихгүй
+            total_inserted += merge_content_posts(rows)
+            conn.commit()
+            save_checkpoint(checkpoints, person_id, posts[-1])
+
+            total_posts += len(posts)
+            print(f"  {person_id}: {total_posts} пост боловсруулав, {total_inserted} шинэ холбоос")
+
     print(" Content.Post insert амжилттай")
 
 except Exception as e:
@@ -186,3 +268,4 @@ except Exception as e:
 finally:
     cursor.close()
     conn.close()
+    read_conn.close()
@@ -1,9 +1,28 @@
 import pandas as pd
 import json
+import os
 import re
+import sys
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+# DataProcessing/ доторх нийтлэг модулиуд (parallel.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from parallel import map_shards
+from match_key import phrase_keys
 
 INPUT_EXCEL = "location_dictionary.xlsx"
 OUTPUT_JSON = "location_dictionary.json"
+COLLISIONS_JSON = "alias_collisions.json"  # alias -> олон canonical
+
+MAX_ALIASES = None  # None = бүх хувилбарыг хадгална (хуучин нь [:50])
+# Түлхүүр (match_key) нь ижил alias-уудыг ч бүгдийг нь хадгална:
+# db.py (fold=False), level.py → insert.py түүхий бичлэгээр тааруулдаг.
+# Түлхүүрээр нэгтгэх нь зөвхөн alias_index.py-д (индекс үүсгэхэд) хийгдэнэ.
+WORKERS = None  # процессын тоо (None = бүх цөм, 1 = serial)
+
+STAGES = ("base", "vowel_drop", "numeric", "filter")
 
 # -----------------------------
 # TEXT NORMALIZATION
@@ -30,8 +49,13 @@ CYR_TO_LAT = {
     "ы": "i", "э": "e", "ю": "yu", "я": "ya"
 }
 
+@lru_cache(maxsize=None)
+def cyr_to_lat_word(word):
+    return "".join(CYR_TO_LAT.get(c, c) for c in word)
+
 def cyr_to_lat(text):
-    return "".join(CYR_TO_LAT.get(c, c) for c in text)
+    # Үг бүрийг нэг л удаа хөрвүүлнэ (ижил үгс олон canonical-д давтагддаг)
+    return " ".join(cyr_to_lat_word(w) for w in text.split(" "))
 
 # -----------------------------
 # NUMBER MAPS (BIDIRECTIONAL)
@@ -80,17 +104,19 @@ def word_to_number_aliases(text):
 
     return aliases
 
+@lru_cache(maxsize=None)
 def add_numeric_bidirectional_aliases(text):
     out = set()
     for a in number_to_word_aliases(text):
         out.update(word_to_number_aliases(a))
-    return out
+    return frozenset(out)
 
 # -----------------------------
 # VOWEL LIGHT DROP
 # -----------------------------
 VOWELS = "aeiouөүёэ"
 
+@lru_cache(maxsize=None)
 def vowel_light_drop(word):
     if len(word) <= 3:
         return word
@@ -99,13 +125,22 @@ def vowel_light_drop(word):
 # -----------------------------
 # MAIN ALIAS GENERATOR
 # -----------------------------
-def generate_aliases(canonical, max_aliases=50):
+def alias_key(alias):
+    return " ".join(phrase_keys(alias.split()))
+
+
+def generate_aliases(canonical, max_aliases=MAX_ALIASES, times=None):
+    """
+    times: {үе шат: секунд} dict өгвөл үе шат бүрийн хугацааг нэмнэ
+    """
+    t0 = time.perf_counter()
     aliases = set()
 
     base = normalize(canonical)
     lat = cyr_to_lat(base)
 
     aliases.update({base, base.replace(" ", ""), lat, lat.replace(" ", "")})
+    t1 = time.perf_counter()
 
     for text in [base, lat]:
         words = text.split()
@@ -113,35 +148,92 @@ def generate_aliases(canonical, max_aliases=50):
             words2 = words[:]
             words2[i] = vowel_light_drop(w)
             aliases.add(" ".join(words2))
+    t2 = time.perf_counter()
 
     for a in list(aliases):
         aliases.update(add_numeric_bidirectional_aliases(a))
+    t3 = time.perf_counter()
+
+    aliases = sorted(a for a in aliases if len(a) >= 3)
+    if max_aliases is not None:
+        aliases = aliases[:max_aliases]
+    t4 = time.perf_counter()
+
+    if times is not None:
+        for stage, dt in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+            times[stage] = times.get(stage, 0.0) + dt
+
+    return aliases
 
-    aliases = {a for a in aliases if len(a) >= 3}
 
-    return sorted(list(aliases))[:max_aliases]
+def generate_aliases_timed(canonical):
+    # Процесс бүр өөрийн хугацааг буцааж, эцэг процесс нэгтгэнэ
+    times = {}
+    return generate_aliases(canonical, times=times), times
+
+# -----------------------------
+# ALIAS COLLISIONS
+# -----------------------------
+def build_collisions(location_dict):
+    """
+    alias-ийн түлхүүр → [байршлын түлхүүр, ...] (нэгээс олон байршилд таарсан)
+    Байршил бүрт "ambiguous_aliases" нэмнэ: alias_index.py эдгээрийг
+    "common" төрлөөр (контекст шаардсан) индекслэнэ.
+    """
+    # Engine-ийн адилаар match_key-ийн түлхүүрээр харьцуулна
+    owners = defaultdict(list)
+    for key, loc in location_dict.items():
+        for alias_k in dict.fromkeys(alias_key(a) for a in loc["aliases"]):
+            owners[alias_k].append(key)
+
+    collisions = {alias_k: keys for alias_k, keys in owners.items() if len(keys) > 1}
+
+    for loc in location_dict.values():
+        loc["ambiguous_aliases"] = [a for a in loc["aliases"] if alias_key(a) in collisions]
+
+    return dict(sorted(collisions.items()))
 
 # -----------------------------
 # LOAD EXCEL → JSON
 # -----------------------------
-df = pd.read_excel(INPUT_EXCEL)
+started = time.perf_counter()
+df = pd.read_excel(INPUT_EXCEL).reindex(columns=["canonical", "type", "lat", "lon"])
+rows = [
+    row for row in zip(df["canonical"].tolist(), df["type"].tolist(), df["lat"].tolist(), df["lon"].tolist())
+    if isinstance(row[0], str)
+]
+print(f"Excel уншсан: {time.perf_counter() - started:.2f} сек, {len(rows)} мөр")
+
+results = map_shards(generate_aliases_timed, [row[0] for row in rows], WORKERS)
+
+stage_times = dict.fromkeys(STAGES, 0.0)
 location_dict = {}
 
-for _, row in df.iterrows():
-    canonical = row.get("canonical")
-    if not isinstance(canonical, str):
-        continue
+for (canonical, loc_type, lat, lon), (aliases, times) in zip(rows, results):
+    for stage, dt in times.items():
+        stage_times[stage] += dt
 
     key = normalize(canonical)
     location_dict[key] = {
         "canonical": canonical,
-        "type": row.get("type"),
-        "lat": row.get("lat"),
-        "lon": row.get("lon"),
-        "aliases": generate_aliases(canonical)
+        "type": loc_type,
+        "lat": lat,
+        "lon": lon,
+        "aliases": aliases
     }
 
+collisions = build_collisions(location_dict)
+
 with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
     json.dump(location_dict, f, ensure_ascii=False, indent=2)
 
-print(f"✅ Generated {len(location_dict)} locations with advanced aliases")
+with open(COLLISIONS_JSON, "w", encoding="utf-8") as f:
+    json.dump(collisions, f, ensure_ascii=False, indent=2)
+
+n_aliases = sum(len(loc["aliases"]) for loc in location_dict.values())
+print(f"✅ Generated {len(location_dict)} locations with advanced aliases ({n_aliases} aliases)")
+print(f"⚠️ {len(collisions)} ambiguous aliases → {COLLISIONS_JSON}")
+# Процессуудын нийлбэр CPU хугацаа (зэрэг ажилласан бол бодит хугацаанаас их)
+for stage in STAGES:
+    print(f"   {stage}: {stage_times[stage]:.2f} сек")
+print(f"Нийт: {time.perf_counter() - started:.2f} сек")
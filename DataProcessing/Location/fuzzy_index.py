@@ -0,0 +1,96 @@
+# =========================================================
+# ========== FUZZY ALIAS LOOKUP (SYMSPELL DELETES) =========
+# =========================================================
+# Alias-ийн эхний үгийн түлхүүрүүдээс (match_key) 1-2 тэмдэгт хассан
+# бүх хэлбэрийг урьдчилан индекслэнэ. Постын үгийн мөн адил хасалтуудыг
+# индексээс хайхад засах зайд (edit distance) багтах нэр дэвшигчид шууд
+# олдох тул индексийн хэмжээнээс бараг хамаарахгүй:
+# "horolol" → "horoolol", "baynzurh" → "bayanzurh".
+# Нэр дэвшигч бүрийг Damerau (OSA) зайгаар баталгаажуулна.
+
+# Үгийн уртаас хамаарах зөвшөөрөх зай: богино үгэнд хэтэрхий олон
+# санамсаргүй давхцал гардаг ("орон" → "мөрөн") тул тоо, 4 хүртэлх тэмдэгттэй үгэнд 0
+MIN_LEN = 5    # >= 5 тэмдэгт: 1 засвар
+LONG_LEN = 8   # >= 8 тэмдэгт: 2 засвар
+MAX_DISTANCE = 2
+
+
+def max_distance(word):
+    if len(word) < MIN_LEN or word.isdigit():
+        return 0
+    return MAX_DISTANCE if len(word) >= LONG_LEN else 1
+
+
+def deletes(word, distance):
+    """
+    word-оос distance хүртэл тэмдэгт хасч болох бүх хэлбэр (word өөрөө орно)
+    """
+    found = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+
+def build_fuzzy_index(index):
+    """
+    {first_word: [item, ...]} индексээс {хасалт: [first_word, ...]}.
+    Зөвхөн "common" биш alias-тай түлхүүрүүд (common нь контекст шаарддаг
+    тул ойролцоо бичлэгээр таамаглахгүй).
+    """
+    fuzzy = {}
+    for word, items in index.items():
+        distance = max_distance(word)
+        if distance == 0 or all(item["type"] == "common" for item in items):
+            continue
+        for d in deletes(word, distance):
+            fuzzy.setdefault(d, []).append(word)
+    return fuzzy
+
+
+def distance(a, b, limit):
+    """
+    Optimal string alignment зай (солих, нэмэх, хасах, хөрш сэлгэх).
+    limit-ээс их бол None.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    if a == b:
+        return 0
+
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return None
+        prev2, prev = prev, cur
+
+    return prev[-1] if prev[-1] <= limit else None
+
+
+def lookup(fuzzy, token):
+    """
+    token-оос max_distance(token) зайд байгаа түлхүүрүүд: [(word, зай), ...]
+    зай өсөхөөр (ижил бол цагаан толгойн дарааллаар)
+    """
+    limit = max_distance(token)
+    if limit == 0:
+        return []
+
+    words = set()
+    for d in deletes(token, limit):
+        words.update(fuzzy.get(d, ()))
+
+    found = []
+    for word in words:
+        dist = distance(token, word, limit)
+        if dist:
+            found.append((dist, word))
+    return [(word, dist) for dist, word in sorted(found)]
@@ -0,0 +1,111 @@
+import sqlite3
+import time
+
+# =========================================================
+# ============ REVERSE GEOCODE CACHE (SQLITE) =============
+# =========================================================
+# lat/lon → (aimag, sum_duureg) хариултуудыг диск дээр хадгална.
+# Ажиллуулалт хооронд болон скриптүүдийн хооронд хуваалцагдах тул
+# region.py-г дахин ажиллуулахад зөвхөн шинэ координатад request явна.
+#
+# Түлхүүр: координатыг PRECISION оронгоор бөөрөнхийлөөд бүхэл тоо
+# болгосон (lat_key, lon_key). 5 орон ≈ 1 метр.
+
+CACHE_FILE = "geocode_cache.sqlite"
+PRECISION = 5
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS reverse_geocode (
+        precision  INTEGER NOT NULL,
+        lat_key    INTEGER NOT NULL,
+        lon_key    INTEGER NOT NULL,
+        aimag      TEXT,
+        sum_duureg TEXT,
+        source     TEXT,
+        updated_at REAL,
+        PRIMARY KEY (precision, lat_key, lon_key)
+    )
+"""
+
+
+def open_cache(path=CACHE_FILE, precision=PRECISION):
+    """
+    Cache нээх (файл байхгүй бол үүсгэнэ).
+    Буцаах dict: conn, precision, hits, misses
+    """
+    conn = sqlite3.connect(path)
+    # Өөр скрипт зэрэг уншиж/бичиж болохоор WAL горим
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(SCHEMA)
+    conn.commit()
+    return {"conn": conn, "precision": precision, "hits": 0, "misses": 0}
+
+
+def cache_key(cache, lat, lon):
+    scale = 10 ** cache["precision"]
+    return cache["precision"], round(float(lat) * scale), round(float(lon) * scale)
+
+
+def _lookup(cache, lat, lon):
+    return cache["conn"].execute(
+        "SELECT aimag, sum_duureg FROM reverse_geocode "
+        "WHERE precision = ? AND lat_key = ? AND lon_key = ?",
+        cache_key(cache, lat, lon)
+    ).fetchone()
+
+
+def cache_contains(cache, lat, lon):
+    """
+    Cache-д байгаа эсэх (hit/miss тоолуурт нөлөөлөхгүй, урьдчилсан шалгалтад)
+    """
+    return _lookup(cache, lat, lon) is not None
+
+
+def cache_get(cache, lat, lon):
+    """
+    (aimag, sum_duureg) эсвэл None (cache-д байхгүй)
+    """
+    row = _lookup(cache, lat, lon)
+
+    if row is None:
+        cache["misses"] += 1
+        return None
+
+    cache["hits"] += 1
+    return row
+
+
+def cache_put(cache, lat, lon, aimag, sum_duureg, source="nominatim"):
+    # Нэг бүрчлэн commit хийнэ: request бүр ~1 сек тул зардал бага,
+    # харин тасалдсан ч олсон хариултууд алдагдахгүй
+    cache["conn"].execute(
+        "INSERT OR REPLACE INTO reverse_geocode "
+        "(precision, lat_key, lon_key, aimag, sum_duureg, source, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (*cache_key(cache, lat, lon), aimag, sum_duureg, source, time.time())
+    )
+    cache["conn"].commit()
+
+
+def cache_items(cache, source="nominatim"):
+    """
+    Хадгалсан хариултууд: (lat, lon, aimag, sum_duureg), тухайн precision-оор
+    """
+    scale = 10 ** cache["precision"]
+    rows = cache["conn"].execute(
+        "SELECT lat_key, lon_key, aimag, sum_duureg FROM reverse_geocode "
+        "WHERE precision = ? AND source = ?",
+        (cache["precision"], source)
+    )
+    for lat_key, lon_key, aimag, sum_duureg in rows:
+        yield lat_key / scale, lon_key / scale, aimag, sum_duureg
+
+
+def cache_stats(cache):
+    total = cache["hits"] + cache["misses"]
+    rate = 100 * cache["hits"] / total if total else 0.0
+    return f"Cache: {cache['hits']} hit, {cache['misses']} miss ({rate:.1f}% hit)"
+
+
+def close_cache(cache):
+    cache["conn"].close()
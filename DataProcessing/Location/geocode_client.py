@@ -0,0 +1,201 @@
+import asyncio
+import time
+
+from geocode_cache import PRECISION
+
+# =========================================================
+# ========= CONCURRENT REVERSE GEOCODING (ASYNCIO) ========
+# =========================================================
+# Олон Nominatim endpoint-д (нийтийн + өөрсдийн local instance гэх мэт)
+# зэрэг request илгээнэ. Endpoint бүр өөрийн token bucket (rate, burst)
+# болон зэрэг ажиллах worker-ийн тоотой (concurrency). Бүх worker нэг
+# дараалалаас ажил авах тул хурдан endpoint илүү олон координат авна.
+# Ижил (бөөрөнхийлсөн) координатын давхар request нэг болж нийлнэ.
+
+# rate: секундэд зөвшөөрөх request, burst: нэг дор зарцуулж болох нөөц
+ENDPOINTS = [
+    {
+        "name": "public",
+        "url": "https://nominatim.openstreetmap.org/reverse",
+        "rate": 1.0,
+        "burst": 1,
+        "concurrency": 1,
+    },
+    # {
+    #     "name": "local",
+    #     "url": "http://localhost:8080/reverse",
+    #     "rate": 20.0,
+    #     "burst": 5,
+    #     "concurrency": 4,
+    # },
+]
+
+USER_AGENT = "mongolia_location_enricher_v1"
+TIMEOUT_SECONDS = 10
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 1.0  # 1, 2, 4 ... секунд
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+UNKNOWN = ("Тодорхойгүй", "Тодорхойгүй")
+
+# =========================================================
+# ==================== ADDRESS PARSE ======================
+# =========================================================
+def parse_address(address):
+    """
+    Nominatim-ийн address → (aimag, sum_duureg)
+    """
+    # Аймаг / Хот
+    aimag = (
+        address.get("state")
+        or address.get("province")
+        or address.get("region")
+        or address.get("city")
+    )
+
+    # Сум / Дүүрэг
+    sum_duureg = (
+        address.get("county")
+        or address.get("district")
+        or address.get("suburb")
+        or address.get("town")
+        or address.get("village")
+    )
+
+    return aimag, sum_duureg
+
+# =========================================================
+# ==================== TOKEN BUCKET =======================
+# =========================================================
+def make_bucket(rate, burst):
+    return {"rate": rate, "capacity": burst, "tokens": burst, "updated": time.monotonic()}
+
+
+async def acquire(bucket):
+    # Нэг event loop дотор ажиллах тул шалгах, хасах хоёрын хооронд lock хэрэггүй
+    while True:
+        now = time.monotonic()
+        bucket["tokens"] = min(
+            bucket["capacity"],
+            bucket["tokens"] + (now - bucket["updated"]) * bucket["rate"]
+        )
+        bucket["updated"] = now
+        if bucket["tokens"] >= 1:
+            bucket["tokens"] -= 1
+            return
+        await asyncio.sleep((1 - bucket["tokens"]) / bucket["rate"])
+
+# =========================================================
+# ======================= REQUEST =========================
+# =========================================================
+class RetryableStatus(Exception):
+    pass
+
+
+async def fetch(session, endpoint, bucket, lat, lon):
+    """
+    Нэг координатыг нэг endpoint-оос авах. 429/5xx, холболтын алдаа,
+    timeout гарвал BACKOFF_SECONDS * 2^n хүлээгээд дахин оролдоно.
+    """
+    import aiohttp
+
+    params = {
+        "lat": lat,
+        "lon": lon,
+        "format": "jsonv2",
+        "addressdetails": 1,
+        "accept-language": "mn",
+    }
+
+    for attempt in range(MAX_RETRIES + 1):
+        await acquire(bucket)
+        try:
+            async with session.get(endpoint["url"], params=params) as resp:
+                if resp.status in RETRY_STATUS:
+                    raise RetryableStatus(f"{endpoint['name']}: HTTP {resp.status}")
+                resp.raise_for_status()
+                data = await resp.json(content_type=None)
+
+            if not data or "error" in data:
+                return UNKNOWN
+            return parse_address(data.get("address", {}))
+
+        except (RetryableStatus, aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == MAX_RETRIES:
+                raise
+            await asyncio.sleep(BACKOFF_SECONDS * 2 ** attempt)
+
+# =========================================================
+# ======================== CLIENT =========================
+# =========================================================
+async def _worker(client, endpoint, bucket):
+    queue = client["queue"]
+    while True:
+        key, lat, lon, future = await queue.get()
+        try:
+            result = await fetch(client["session"], endpoint, bucket, lat, lon)
+            if client["on_result"] is not None:
+                client["on_result"](lat, lon, result)
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            del client["pending"][key]
+            queue.task_done()
+
+
+async def open_client(endpoints=ENDPOINTS, on_result=None):
+    """
+    on_result(lat, lon, result): амжилттай хариулт бүрт (жишээ нь cache-д бичих)
+    """
+    import aiohttp
+
+    session = aiohttp.ClientSession(
+        headers={"User-Agent": USER_AGENT},
+        timeout=aiohttp.ClientTimeout(total=TIMEOUT_SECONDS)
+    )
+    client = {
+        "session": session,
+        "queue": asyncio.Queue(),
+        "pending": {},
+        "on_result": on_result,
+        "workers": [],
+    }
+    for endpoint in endpoints:
+        bucket = make_bucket(endpoint["rate"], endpoint["burst"])
+        for _ in range(endpoint["concurrency"]):
+            client["workers"].append(asyncio.create_task(_worker(client, endpoint, bucket)))
+    return client
+
+
+def submit(client, lat, lon):
+    """
+    Координатыг дараалалд нэмж future буцаана. Ижил координат
+    боловсруулагдаж байгаа бол тэр request-ийн future-ийг хуваалцана.
+    """
+    key = (round(float(lat), PRECISION), round(float(lon), PRECISION))
+    future = client["pending"].get(key)
+    if future is None:
+        future = asyncio.get_running_loop().create_future()
+        client["pending"][key] = future
+        client["queue"].put_nowait((key, lat, lon, future))
+    return future
+
+
+async def close_client(client):
+    for task in client["workers"]:
+        task.cancel()
+    await asyncio.gather(*client["workers"], return_exceptions=True)
+    await client["session"].close()
+
+
+async def reverse_many(coords, endpoints=ENDPOINTS, on_result=None):
+    """
+    [(lat, lon), ...] → [(aimag, sum_duureg) эсвэл Exception, ...] (ижил дарааллаар)
+    """
+    client = await open_client(endpoints, on_result)
+    try:
+        futures = [submit(client, lat, lon) for lat, lon in coords]
+        return await asyncio.gather(*futures, return_exceptions=True)
+    finally:
+        await close_client(client)
@@ -0,0 +1,278 @@
+import json
+
+import numpy as np
+
+# =========================================================
+# ============= COMPACT LOCATION HIERARCHY (NPZ) ==========
+# =========================================================
+# level_1..level_6.json-ийн оронд нэг файл: зангилаа бүр бүхэл id-тай,
+# эцэг нь parent[id] (үндэс -1), түвшин нь level[id]. Нэрс нэг удаа
+# (intern) UTF-8 blob + offset хэлбэрээр хадгалагдана, координат float
+# массив (байхгүй бол NaN). np.load нэг удаа уншаад бүх массив бэлэн.
+#
+# Зангилаа (canonical, level)-ээр давхардалгүй - insert.py-ийн contents
+# хүснэгтийн түлхүүртэй ижил. Давхардвал эхнийх нь үлдэнэ.
+#
+# ancestors[id, lvl - 1] = тухайн зангилааны lvl түвшний өвөг (өөрөө ч
+# байж болно), байхгүй бол -1. Урьдчилан бодсон тул тоолсон давтамжийг
+# бүх түвшинд модоор алхалгүй, нэг bincount-оор нэгтгэнэ (rollup_counts).
+
+HIERARCHY_FILE = "location_hierarchy.npz"
+LEVEL_FILE = "level_{}.json"
+LEVELS = range(1, 7)
+MAX_LEVEL = 6
+
+# Байршил (location_dictionary-ийн canonical) энэ түвшинд байна
+LEAF_LEVEL = 5
+
+# insert_locations дуудагддаг түвшнүүд (lat/lon/location_type-тай)
+LOCATION_LEVELS = (1, 2, 3, 5)
+
+ROOT = -1
+
+# =========================================================
+# ======================= BUILD ===========================
+# =========================================================
+def norm(text):
+    # Толь бичгийн нэрсийн ("Хан-Уул ") илүү хоосон зайг хасна.
+    # level.py нэмэхдээ, rollup_counts хайхдаа хоёулаа үүнийг ашиглана.
+    return text.strip()
+
+
+def new_hierarchy():
+    return {
+        "ids": {},        # (canonical, level) -> node id
+        "strings": {},    # нэр/төрөл -> string id (intern)
+        "name": [],
+        "level": [],
+        "parent": [],
+        "lat": [],
+        "lon": [],
+        "type": [],
+    }
+
+
+def _intern(h, text):
+    if text is None:
+        return ROOT
+    return h["strings"].setdefault(text, len(h["strings"]))
+
+
+def add_node(h, canonical, level, parent=None, lat=None, lon=None, location_type=None):
+    """
+    parent: (canonical, level) эсвэл None. Node id буцаана.
+    Эцэг нь өмнө нэмэгдсэн байх ёстой (insert.py-тэй адил дараалал).
+    """
+    key = (canonical, level)
+    node = h["ids"].get(key)
+    if node is not None:
+        return node
+
+    parent_id = ROOT
+    if parent is not None:
+        parent_id = h["ids"].get(parent)
+        if parent_id is None:
+            raise KeyError(f"Parent not found: {parent[0]} (level {parent[1]})")
+
+    node = len(h["name"])
+    h["ids"][key] = node
+    h["name"].append(_intern(h, canonical))
+    h["level"].append(level)
+    h["parent"].append(parent_id)
+    h["lat"].append(np.nan if lat is None else lat)
+    h["lon"].append(np.nan if lon is None else lon)
+    h["type"].append(_intern(h, location_type))
+    return node
+
+
+def _pack_strings(strings):
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+def _unpack_strings(blob, offsets):
+    data = blob.tobytes()
+    return [data[a:b].decode("utf-8") for a, b in zip(offsets[:-1], offsets[1:])]
+
+
+def ancestor_table(parent, level):
+    """
+    (зангилаа × MAX_LEVEL) өвгийн хүснэгт. Гүн бүрт нэг вектор алхам:
+    бүх зангилааны "одоогийн" өвгийг зэрэг нь нэг шат дээшлүүлнэ.
+    """
+    n = len(parent)
+    ancestors = np.full((n, MAX_LEVEL), ROOT, dtype=np.int32)
+    rows = np.arange(n)
+    current = rows
+    while len(current):
+        ancestors[rows, level[current] - 1] = current
+        up = parent[current]
+        keep = up != ROOT
+        rows, current = rows[keep], up[keep]
+    return ancestors
+
+
+def freeze(h):
+    """
+    Жагсаалтуудыг numpy массив болгох (хадгалах, хайхад бэлэн хэлбэр)
+    """
+    strings = list(h["strings"])
+    parent = np.asarray(h["parent"], dtype=np.int32)
+    level = np.asarray(h["level"], dtype=np.int8)
+    return {
+        "name": np.asarray(h["name"], dtype=np.int32),
+        "level": level,
+        "parent": parent,
+        "ancestors": ancestor_table(parent, level),
+        "lat": np.asarray(h["lat"], dtype=np.float64),
+        "lon": np.asarray(h["lon"], dtype=np.float64),
+        "type": np.asarray(h["type"], dtype=np.int32),
+        "strings": strings,
+        "ids": dict(h["ids"]),
+    }
+
+# =========================================================
+# ===================== SAVE / LOAD =======================
+# =========================================================
+def save_hierarchy(store, path=HIERARCHY_FILE):
+    blob, offsets = _pack_strings(store["strings"])
+    np.savez(
+        path,
+        name=store["name"], level=store["level"], parent=store["parent"],
+        ancestors=store["ancestors"],
+        lat=store["lat"], lon=store["lon"], type=store["type"],
+        string_blob=blob, string_offsets=offsets,
+    )
+
+
+def load_hierarchy(path=HIERARCHY_FILE):
+    with np.load(path) as data:
+        store = {k: data[k] for k in ("name", "level", "parent", "ancestors", "lat", "lon", "type")}
+        store["strings"] = _unpack_strings(data["string_blob"], data["string_offsets"])
+
+    names = store["strings"]
+    store["ids"] = {
+        (names[n], int(lvl)): node
+        for node, (n, lvl) in enumerate(zip(store["name"].tolist(), store["level"].tolist()))
+    }
+    return store
+
+# =========================================================
+# ======================= LOOKUP ==========================
+# =========================================================
+def node_id(store, canonical, level):
+    return store["ids"].get((canonical, level))
+
+
+def canonical_of(store, node):
+    return store["strings"][store["name"][node]]
+
+
+def parent_of(store, node):
+    """
+    Эцгийн node id, үндэс бол -1
+    """
+    return int(store["parent"][node])
+
+
+def ancestor_of(store, node, lvl):
+    """
+    lvl түвшний өвгийн node id, байхгүй бол -1
+    """
+    return int(store["ancestors"][node, lvl - 1])
+
+# =========================================================
+# ======================= ROLLUP ==========================
+# =========================================================
+def rollup_counts(store, counts, leaf_level=LEAF_LEVEL):
+    """
+    counts: {canonical: давтамж} (leaf_level-ийн нэрс, location_report-ийн Counter).
+    Engine-ийн canonical нь толь бичгийн түүхий нэр тул norm()-оор хайна.
+    Буцаах: {lvl: (node бүрийн нийлбэр массив, өвөггүй/танигдаагүй давтамж)}
+    """
+    nodes = np.fromiter(
+        (store["ids"].get((norm(canonical), leaf_level), ROOT) for canonical in counts),
+        dtype=np.int32, count=len(counts)
+    )
+    weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+
+    known = nodes != ROOT
+    unknown = weights[~known].sum()
+    ancestors = store["ancestors"][nodes[known]]
+    weights = weights[known]
+    size = len(store["name"])
+
+    rollups = {}
+    for lvl in LEVELS:
+        column = ancestors[:, lvl - 1]
+        found = column != ROOT
+        totals = np.bincount(column[found], weights=weights[found], minlength=size)
+        rollups[lvl] = (totals.astype(np.int64), int(unknown + weights[~found].sum()))
+    return rollups
+
+# =========================================================
+# =================== JSON EXPORT / IMPORT ================
+# =========================================================
+def _number(value):
+    return None if np.isnan(value) else float(value)
+
+
+def level_items(store, lvl):
+    """
+    Тухайн түвшний зангилаанууд level_N.json-ийн хуучин бүтэцтэй
+    """
+    strings = store["strings"]
+    items = []
+    for node in np.flatnonzero(store["level"] == lvl).tolist():
+        parent = parent_of(store, node)
+        item = {
+            "canonical": strings[store["name"][node]],
+            "level": lvl,
+            "parent": None if parent == ROOT else {
+                "canonical": strings[store["name"][parent]],
+                "level": int(store["level"][parent]),
+            },
+        }
+        if lvl in LOCATION_LEVELS:
+            type_id = store["type"][node]
+            item["lat"] = _number(store["lat"][node])
+            item["lon"] = _number(store["lon"][node])
+            item["location_type"] = None if type_id == ROOT else strings[type_id]
+        items.append(item)
+    return items
+
+
+def export_levels(store, pattern=LEVEL_FILE):
+    """
+    insert.py-д зориулж level_1..level_6.json бичих
+    """
+    for lvl in LEVELS:
+        with open(pattern.format(lvl), "w", encoding="utf-8") as f:
+            json.dump(level_items(store, lvl), f, ensure_ascii=False, indent=2)
+
+
+def import_levels(pattern=LEVEL_FILE):
+    """
+    Одоо байгаа (гараар зассан) level_N.json файлуудаас store үүсгэх
+    """
+    h = new_hierarchy()
+    for lvl in LEVELS:
+        with open(pattern.format(lvl), encoding="utf-8") as f:
+            for item in json.load(f):
+                parent = item.get("parent")
+                add_node(
+                    h, item["canonical"], item["level"],
+                    parent=(parent["canonical"], parent["level"]) if parent else None,
+                    lat=item.get("lat"), lon=item.get("lon"),
+                    location_type=item.get("location_type"),
+                )
+    return freeze(h)
+
+
+if __name__ == "__main__":
+    store = import_levels()
+    save_hierarchy(store)
+    print(f"✅ {len(store['name'])} зангилаа, {len(store['strings'])} нэр → {HIERARCHY_FILE}")
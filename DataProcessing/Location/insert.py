@@ -1,5 +1,6 @@
 import json
 import psycopg2
+from psycopg2.extras import execute_values
 
 # =====================================================
 # ================ DB CONNECTION ======================
@@ -21,70 +22,91 @@ conn.autocommit = False
 # ================== DB HELPERS =======================
 # =====================================================
 
+PAGE_SIZE = 5000  # нэг INSERT statement-д багтаах мөрийн тоо
+
+# (canonical, level) -> contents.id
+content_ids = {}
+
+
+def load_content_ids():
+    """Өмнө нь оруулсан contents-ийг нэг SELECT-ээр санах ойд ачаалах"""
+    cursor.execute("SELECT text, level, id FROM contents")
+    for text, level, content_id in cursor.fetchall():
+        content_ids.setdefault((text, level), content_id)
+
+
 def get_content_id(canonical, level):
-    cursor.execute("""
-        SELECT id
-        FROM contents
-        WHERE text = %s AND level = %s
-    """, (canonical, level))
-
-    row = cursor.fetchone()
-    if not row:
+    content_id = content_ids.get((canonical, level))
+    if content_id is None:
         raise Exception(f"Parent not found: {canonical} (level {level})")
-    return row[0]
-
+    return content_id
+
+
+def insert_contents(items):
+    """
+    Тухайн level-ийн шинэ мөрүүдийг олон мөрт INSERT ... RETURNING-ээр
+    оруулж, үүссэн id-уудыг content_ids-д нэмнэ. Эцэг id-г санах ойгоос.
+    """
+    rows = []
+    pending = set()
+
+    for item in items:
+        canonical = item["canonical"]
+        level = item["level"]
+        key = (canonical, level)
+
+        if key in content_ids or key in pending:
+            continue
+        pending.add(key)
+
+        parent = item.get("parent")
+        parent_id = None
+        if parent:
+            parent_id = get_content_id(parent["canonical"], parent["level"])
+
+        rows.append((
+            canonical,
+            level,
+            parent_id,
+            item.get("isParent", True),
+            "location"
+        ))
+
+    if not rows:
+        return 0
+
+    returned = execute_values(cursor, """
+        INSERT INTO contents
+        (text, level, parent_id, is_parent, type)
+        VALUES %s
+        RETURNING text, level, id
+    """, rows, page_size=PAGE_SIZE, fetch=True)
 
-def content_exists(canonical, level):
-    cursor.execute("""
-        SELECT 1
-        FROM contents
-        WHERE text = %s AND level = %s
-    """, (canonical, level))
-    return cursor.fetchone() is not None
+    for text, level, content_id in returned:
+        content_ids[(text, level)] = content_id
 
+    return len(rows)
 
-def insert_content(item):
-    canonical = item["canonical"]
-    level = item["level"]
-    parent = item.get("parent")
-    is_parent = item.get("isParent", True)
 
-    if content_exists(canonical, level):
-        return
+def insert_locations(items):
+    rows = [
+        (
+            get_content_id(item["canonical"], item["level"]),
+            item["location_type"],
+            item.get("lat"),
+            item.get("lon")
+        )
+        for item in items
+    ]
 
-    parent_id = None
-    if parent:
-        parent_id = get_content_id(parent["canonical"], parent["level"])
+    if rows:
+        execute_values(cursor, """
+            INSERT INTO location
+            (content_id, type, latitude, longitude)
+            VALUES %s
+        """, rows, page_size=PAGE_SIZE)
 
-    cursor.execute("""
-        INSERT INTO contents
-        (text, level, parent_id, is_parent, type)
-        VALUES (%s, %s, %s, %s, %s)
-    """, (
-        canonical,
-        level,
-        parent_id,
-        is_parent,
-        "location"
-    ))
-
-
-def insert_location(item):
-    canonical = item["canonical"]
-    level = item["level"]
-
-    content_id = get_content_id(canonical, level)
-
-    cursor.execute("""
-        INSERT INTO location
-        (content_id, type, latitude, longitude)
-        VALUES (%s, %s, %s, %s)
-    """, (
-        content_id,
-        item["location_type"],
-        item.get("lat"),
-        item.get("lon")
-    ))
+    return len(rows)
 
 
 # =====================================================
@@ -109,33 +131,29 @@ level_6 = load_json("level_6.json")
 # =====================================================
 
 try:
+    load_content_ids()
+
     print("Level 1 insert")
-    for item in level_1:
-        insert_content(item)
-        insert_location(item)
+    insert_contents(level_1)
+    insert_locations(level_1)
 
     print("Level 2 insert")
-    for item in level_2:
-        insert_content(item)
-        insert_location(item)
+    insert_contents(level_2)
+    insert_locations(level_2)
 
     print("Level 3 insert")
-    for item in level_3:
-        insert_content(item)
-        insert_location(item)
+    insert_contents(level_3)
+    insert_locations(level_3)
 
     print("Level 4 insert (Content only)")
-    for item in level_4:
-        insert_content(item)
+    insert_contents(level_4)
 
     print("Level 5 insert")
-    for item in level_5:
-        insert_content(item)
-        insert_location(item)
+    insert_contents(level_5)
+    insert_locations(level_5)
 
     print("Level 6 insert (Alias)")
-    for item in level_6:
-        insert_content(item)
+    insert_contents(level_6)
 
     conn.commit()
     print("ALL DATA INSERTED SUCCESSFULLY")
@@ -0,0 +1,322 @@
+import os
+import re
+import sys
+import time
+
+# DataProcessing/ доторх нийтлэг модулиуд (parallel.py гэх мэт)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from alias_index import load_artifact, DICTIONARY_FILE, CONTEXT_FILE
+from alias_trie import compile_index, candidates
+from fuzzy_index import build_fuzzy_index, lookup, distance, max_distance
+from match_key import key_tokens, phrase_keys
+from parallel import map_shards, MIN_PARALLEL
+
+# =========================================================
+# ==================== MATCH POLICIES =====================
+# =========================================================
+# first_suffix : эхний үгийн араас зөвшөөрөх илүү тэмдэгт (None = хязгааргүй)
+# last_suffix  : сүүлчийн үгийн араас зөвшөөрөх илүү тэмдэгт (стандарт төрөл)
+# common       : "common" төрлийн alias-ийн контекст шалгалт
+#                "suffix" - залгавар / дараагийн үг (logic.py, last.py)
+#                "window" - өмнөх, дараах WINDOW үг (final.py)
+#                None     - төрлийг үл харгалзана (db.py)
+# window       : "window" шалгалтын үгийн тоо
+# fuzzy        : таарахгүй үгэнд 1-2 засвартай alias хайх (fuzzy_index.py)
+POLICIES = {
+    "suffix": {"first_suffix": None, "last_suffix": 4, "common": "suffix", "window": 0, "fuzzy": False},
+    "window": {"first_suffix": 3, "last_suffix": 3, "common": "window", "window": 3, "fuzzy": False},
+    "exact": {"first_suffix": 0, "last_suffix": 0, "common": None, "window": 0, "fuzzy": False},
+}
+
+# Нэг постод fuzzy хайлтад зарцуулах дээд хугацаа (секунд). Хэтэрвэл
+# үлдсэн үгсэд зөвхөн яг таарц хайна.
+FUZZY_BUDGET = 0.005
+
+# =========================================================
+# ===================== NORMALIZE ==========================
+# =========================================================
+def normalize(text):
+    if not isinstance(text, str):
+        return ""
+    text = text.lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+# =========================================================
+# ====================== ENGINE ============================
+# =========================================================
+def make_engine(index, context_words, policy="suffix", compiled=None, fold=True, **overrides):
+    """
+    Alias индекс + контекст үгс + бодлогыг нэг engine болгох.
+    fold: индекс match_key-ээр үүссэн эсэх. False бол постын үгсийг мөн
+          хөрвүүлэхгүй, яг бичлэгээр нь тааруулна (add_to_index(..., fold=False))
+    overrides: POLICIES-ийн утгыг дарж бичих (жишээ нь window=5, fuzzy=True)
+    """
+    engine = dict(POLICIES[policy])
+    engine.update(overrides)
+    engine["policy"] = policy
+    engine["fold"] = fold
+    engine["index"] = index
+    engine["compiled"] = compiled if compiled is not None else compile_index(index)
+    engine.setdefault("fuzzy_budget", FUZZY_BUDGET)
+    engine["fuzzy_index"] = build_fuzzy_index(index) if engine["fuzzy"] else None
+    # Контекст үгсийг alias, постын үгстэй ижил түлхүүр болгоно
+    if fold:
+        engine["context_words"] = {" ".join(phrase_keys(w.lower().split())) for w in context_words}
+    else:
+        engine["context_words"] = {w.lower() for w in context_words}
+    return engine
+
+
+def load_engine(policy="suffix", context_words=None,
+                dictionary_file=DICTIONARY_FILE, context_file=CONTEXT_FILE, **overrides):
+    """
+    Бэлэн artifact-аас engine үүсгэх.
+    context_words өгөөгүй бол context.json-ийн үгсийг ашиглана.
+    """
+    artifact = load_artifact(dictionary_file, context_file)
+    if context_words is None:
+        context_words = artifact["context_words"]
+    overrides.setdefault("window", artifact["context"].get("window", POLICIES[policy]["window"]))
+    return make_engine(artifact["index"], context_words, policy,
+                       compiled=artifact["compiled"], **overrides)
+
+# =========================================================
+# ================= CONTEXT CHECKS ========================
+# =========================================================
+def check_suffix_context(engine, token, alias_base):
+    """
+    13rhoroolol, 120t, 5ruu гэх мэт suffix контекст шалгах
+    """
+    if token.startswith(alias_base) and len(token) > len(alias_base):
+        suffix = token[len(alias_base):]
+        return suffix in engine["context_words"]
+    return False
+
+
+def check_common_logic(engine, tokens, current_idx, match_len, alias_tokens):
+    """
+    COMMON төрөлд зориулсан context-aware шалгалт
+    """
+    n = len(tokens)
+    last_text_token = tokens[current_idx + match_len - 1]
+
+    # CASE 1: suffix дотор context байгаа эсэх
+    if check_suffix_context(engine, last_text_token, alias_tokens[-1]):
+        return True, 0
+
+    # CASE 2: дараагийн үг context эсэх
+    next_ptr = current_idx + match_len
+    if next_ptr < n:
+        next_token = tokens[next_ptr]
+
+        if next_token in engine["context_words"]:
+            return True, 1
+
+        # дараагийн үг өөр байршил эхлэл байвал
+        if next_token in engine["index"]:
+            return True, 0
+
+    return False, 0
+
+
+def has_location_context(engine, tokens, idx, match_len):
+    # Байршил олдсон хэсгийн өмнөх болон дараах WINDOW хэмжээний үгсийг шалгана
+    window = engine["window"]
+    start = max(0, idx - window)
+    end = idx + match_len + window
+    search_area = tokens[start:idx] + tokens[idx + match_len:end]
+    return any(t in engine["context_words"] for t in search_area)
+
+
+def accept_match(engine, item, tokens, i, m):
+    """
+    Сүүлчийн үг + төрлийн бодлогоор шалгах.
+    Зөвшөөрвөл нэмж алгасах үгийн тоог, эс бөгөөс None буцаана.
+    """
+    alias_tokens = item["full_alias_tokens"]
+    common = engine["common"] if item["type"] == "common" else None
+
+    if common == "suffix":
+        ok, skip = check_common_logic(engine, tokens, i, m, alias_tokens)
+        return skip if ok else None
+
+    if len(tokens[i + m - 1]) > len(alias_tokens[-1]) + engine["last_suffix"]:
+        return None
+
+    if common == "window" and not has_location_context(engine, tokens, i, m):
+        return None
+
+    return 0
+
+def prefer_written(engine, items, item, skip, tokens, i, written):
+    """
+    Ижил түлхүүртэй alias-ууд (өөр canonical) байвал постод яг тэр
+    бичлэгээрээ орсныг нь сонгоно: "таваншарт" → "таваншар" (Таван шар),
+    түлхүүр нь ижил "5shar" (5 Шар) биш. Олдохгүй бол item хэвээр.
+    """
+    if any(written.startswith(alias) for alias in item["aliases"]):
+        return item, skip
+
+    for other in items:
+        if other is item or other["full_alias_tokens"] != item["full_alias_tokens"]:
+            continue
+        if any(written.startswith(alias) for alias in other["aliases"]):
+            other_skip = accept_match(engine, other, tokens, i, item["length"])
+            if other_skip is not None:
+                return other, other_skip
+
+    return item, skip
+
+# =========================================================
+# ===================== FUZZY MATCH =======================
+# =========================================================
+def fuzzy_match(engine, tokens, i, n):
+    """
+    i байрлалаас эхэлж n-ээс өмнө дуусах ойролцоо бичлэгтэй alias хайх.
+    Эхний үгийг deletion индексээс, үлдсэнийг шууд зайгаар шалгана.
+    (match, алгасах үг) эсвэл None. "common" alias оролцохгүй.
+    """
+    token = tokens[i]
+    if token in engine["context_words"]:
+        return None
+
+    for word, dist in lookup(engine["fuzzy_index"], token):
+        for item in candidates(engine["compiled"], word, 0):
+            alias_tokens = item["full_alias_tokens"]
+            m = item["length"]
+
+            if item["type"] == "common" or i + m > n:
+                continue
+
+            total = dist
+            for j in range(1, m):
+                d = distance(tokens[i + j], alias_tokens[j], max_distance(alias_tokens[j]))
+                if d is None:
+                    break
+                total += d
+            else:
+                skip = accept_match(engine, item, tokens, i, m)
+                if skip is None:
+                    continue
+                size = sum(len(t) for t in alias_tokens)
+                return {
+                    "item": item,
+                    "text": " ".join(tokens[i:i + m]),
+                    "start": i,
+                    "end": i + m,
+                    "distance": total,
+                    "confidence": round(1 - total / size, 3),
+                }, skip
+
+    return None
+
+
+def fill_fuzzy(engine, tokens, matches):
+    """
+    Яг таарцуудын хоорондох үгсэд л fuzzy хайна: яг таарц хэвээр үлдэж,
+    ойролцоо таарц тэдгээрийн үгийг "булаахгүй". Постод fuzzy_budget
+    секундээс их зарцуулбал үлдсэн үгсийг алгасна.
+    """
+    deadline = time.perf_counter() + engine["fuzzy_budget"]
+    found = []
+    i = 0
+
+    for start, end in [(m["start"], m["end"]) for m in matches] + [(len(tokens), len(tokens))]:
+        while i < start and time.perf_counter() < deadline:
+            hit = fuzzy_match(engine, tokens, i, start)
+            if hit is None:
+                i += 1
+                continue
+            match, skip = hit
+            found.append(match)
+            i = match["end"] + skip
+        i = max(i, end)
+
+    if not found:
+        return matches
+    return sorted(matches + found, key=lambda m: m["start"])
+
+# =========================================================
+# ================= CORE MATCH FUNCTION ===================
+# =========================================================
+def match_tokens(tokens, engine, written=None):
+    """
+    tokens: match_key-ийн түлхүүрүүд
+    written: түлхүүр бүрийн постод бичигдсэн анхны хэлбэр (prefer_written-д)
+    [{"item": alias мэдээлэл, "text": текст дэх хэлбэр, "start", "end"}, ...]
+    олдсон дарааллаар (start/end - tokens доторх байрлал).
+    Fuzzy таарцад нэмэлт "distance", "confidence" (0-1) талбар байна.
+    """
+    matches = []
+    n = len(tokens)
+    i = 0
+
+    while i < n:
+        step = 1
+
+        items = candidates(engine["compiled"], tokens[i], engine["first_suffix"])
+        for item in items:
+            alias_tokens = item["full_alias_tokens"]
+            m = item["length"]
+
+            if i + m > n:
+                continue
+
+            if any(tokens[i + j] != alias_tokens[j] for j in range(m - 1)):
+                continue
+
+            if not tokens[i + m - 1].startswith(alias_tokens[-1]):
+                continue
+
+            skip = accept_match(engine, item, tokens, i, m)
+            if skip is None:
+                continue
+
+            if written is not None:
+                item, skip = prefer_written(engine, items, item, skip, tokens, i,
+                                            " ".join(written[i:i + m]))
+
+            matches.append({"item": item, "text": " ".join(tokens[i:i + m]), "start": i, "end": i + m})
+            step = m + skip
+            break
+
+        i += step
+
+    if engine["fuzzy_index"] is not None:
+        matches = fill_fuzzy(engine, tokens, matches)
+
+    return matches
+
+
+def match_locations(text, engine):
+    """
+    Постын үгсийг түлхүүр болгож тааруулаад "text"-д анхны бичлэгийг буцаана.
+    """
+    tokens = normalize(text).split()
+    if not engine["fold"]:
+        return match_tokens(tokens, engine)
+
+    keys, spans = key_tokens(tokens)
+    written = [" ".join(tokens[a:b]) for a, b in spans]
+    matches = match_tokens(keys, engine, written)
+    for m in matches:
+        m["text"] = " ".join(tokens[spans[m["start"]][0]:spans[m["end"] - 1][1]])
+    return matches
+
+
+def matched_canonicals(text, engine):
+    """Олдсон canonical-ууд, давхардалгүй"""
+    return list(dict.fromkeys(m["item"]["canonical"] for m in match_locations(text, engine)))
+
+# =========================================================
+# ================= BATCH (MULTI-CORE) ====================
+# =========================================================
+def match_batch(texts, engine, func=matched_canonicals, workers=None, min_parallel=MIN_PARALLEL):
+    """
+    Content баганыг процессуудад хувааж func(text, engine)-ийг тооцно.
+    Engine нь fork-оор хуваалцагдана; үр дүн мөрийн анхны дарааллаар.
+    """
+    return map_shards(lambda text: func(text, engine), texts, workers, min_parallel)
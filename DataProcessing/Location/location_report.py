@@ -0,0 +1,105 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from hierarchy import rollup_counts, canonical_of, parent_of, ROOT
+from post_io import append_frame, open_workbook
+
+# =========================================================
+# ============ LOCATION ANALYSIS REPORT (STREAMING) =======
+# =========================================================
+# Постуудыг хэсэг хэсгээр нь write-only Excel рүү шууд бичиж,
+# зөвхөн байршлын давтамжийг санах ойд хадгална.
+# hierarchy (hierarchy.py-ийн store) өгвөл давтамжийг дүүрэг, аймаг/хот
+# зэрэг дээд түвшин рүү нэгтгэсэн хуудсуудыг нэмж гаргана.
+
+SHEET_POSTS = "Постууд"
+SHEET_STATS = "Байршлын статистик"
+SHEET_EXPLODED = "Илэрсэн бүх байршил"
+
+# түвшин → нэгтгэсэн статистикийн хуудас
+LEVEL_SHEETS = {
+    2: "Аймаг, хотын статистик",
+    3: "Дүүрэг, сумын статистик",
+    4: "Хорооны статистик",
+}
+
+UNKNOWN = "Тодорхойгүй"
+
+ALL_SHEETS = [SHEET_POSTS, SHEET_STATS, *LEVEL_SHEETS.values(), SHEET_EXPLODED]
+
+
+def location_stats(counts):
+    total = sum(counts.values())
+    stats = [
+        {
+            "Байршил": loc,
+            "Давтамж": cnt,
+            "Эзлэх хувь (%)": round(cnt / total * 100, 2)
+        }
+        for loc, cnt in counts.items()
+    ]
+    return pd.DataFrame(stats, columns=["Байршил", "Давтамж", "Эзлэх хувь (%)"]).sort_values(
+        "Давтамж", ascending=False
+    )
+
+
+def level_stats(hierarchy, rollups, lvl):
+    """
+    Тухайн түвшний зангилаа бүрийн нийлбэр давтамж. Тухайн түвшинд
+    өвөггүй (жишээ нь хороогүй) эсвэл шатлалд байхгүй байршлууд UNKNOWN мөрөнд.
+    """
+    totals, unknown = rollups[lvl]
+    nodes = np.flatnonzero(totals)
+    total = totals.sum() + unknown
+
+    parents = [parent_of(hierarchy, n) for n in nodes]
+    stats = pd.DataFrame({
+        "Байршил": [canonical_of(hierarchy, n) for n in nodes],
+        "Харьяалал": [canonical_of(hierarchy, p) if p != ROOT else "" for p in parents],
+        "Давтамж": totals[nodes],
+    })
+    if unknown:
+        stats.loc[len(stats)] = [UNKNOWN, "", unknown]
+
+    stats["Эзлэх хувь (%)"] = (stats["Давтамж"] / total * 100).round(2) if total else 0.0
+    return stats.sort_values("Давтамж", ascending=False)
+
+
+def write_location_report(path, chunks, sheets=ALL_SHEETS, hierarchy=None):
+    """
+    chunks: "ID", "matched_locations" баганатай DataFrame-үүдийн урсгал
+    sheets: гаргах хуудсууд (ALL_SHEETS-ийн дэд жагсаалт)
+    hierarchy: hierarchy.load_hierarchy()-ийн store; None бол LEVEL_SHEETS гарахгүй
+    Байршил бүрийн давтамжийг (Counter) буцаана.
+    """
+    if hierarchy is None:
+        sheets = [name for name in sheets if name not in LEVEL_SHEETS.values()]
+    wb, ws = open_workbook([name for name in ALL_SHEETS if name in sheets])
+    counts = Counter()
+
+    for i, chunk in enumerate(chunks):
+        if SHEET_POSTS in ws:
+            append_frame(ws[SHEET_POSTS], chunk, header=i == 0)
+
+        exploded = chunk[["ID", "matched_locations"]].explode("matched_locations").dropna(
+            subset=["matched_locations"]
+        )
+        counts.update(exploded["matched_locations"])
+
+        if SHEET_EXPLODED in ws:
+            append_frame(ws[SHEET_EXPLODED], exploded, header=i == 0)
+
+    if SHEET_STATS in ws:
+        append_frame(ws[SHEET_STATS], location_stats(counts), header=True)
+
+    if hierarchy is not None and any(name in ws for name in LEVEL_SHEETS.values()):
+        # Бүх түвшний нийлбэр нэг дор, мөр бүрээр модоор алхахгүй
+        rollups = rollup_counts(hierarchy, counts)
+        for lvl, name in LEVEL_SHEETS.items():
+            if name in ws:
+                append_frame(ws[name], level_stats(hierarchy, rollups, lvl), header=True)
+
+    wb.save(path)
+    return counts
@@ -0,0 +1,99 @@
+import re
+from functools import lru_cache
+
+# =========================================================
+# ================== MATCH-TIME KEYS =======================
+# =========================================================
+# Alias болон постын үг бүрийг нэг "түлхүүр" хэлбэрт шилжүүлнэ:
+#   - кирилл → латин ("хороолол" → "horoolol")
+#   - x/h, v/w/ү/у, ө/о нэгтгэх ("xoroolol", "dvgeer" → "horoolol", "dugeer")
+#   - үгийн эхний тоо: "нэг", "neg" → "1"; дэс тооны нөхцөл "р", "-р",
+#     "дүгээр", "1 r" → "r" ("нэгдүгээр", "1-р", "1 dugaar" → "1r")
+#   - тооны араах залгавар хэвээр: "dorovд" → "4d", "21r" → "21r"
+# Ингэснээр excelToJson.py-ийн олон бичлэгийн хувилбар нэг түлхүүр болж,
+# индекс болон нэг үгэнд шалгах нэр дэвшигчийн жагсаалт багасна.
+# Залгавар, дэс тооны "r" үлдэх тул suffix дүрэм (+4) болон common
+# төрлийн контекст шалгалт ("13r", "21t") өмнөх шигээ ажиллана.
+
+FOLD = {
+    "а": "a", "б": "b", "в": "u", "г": "g", "д": "d",
+    "е": "e", "ё": "yo", "ж": "j", "з": "z",
+    "и": "i", "й": "i", "к": "k", "л": "l",
+    "м": "m", "н": "n", "о": "o", "ө": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t",
+    "у": "u", "ү": "u", "ф": "f", "х": "h",
+    "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sh",
+    "ъ": "", "ы": "i", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+    # латин бичлэгийн хувилбарууд
+    "x": "h", "v": "u", "w": "u",
+}
+
+FOLD_TABLE = str.maketrans(FOLD)
+
+NUMBER_WORDS = {
+    "1": ["нэг", "neg"],
+    "2": ["хоёр", "hoyor", "hoer"],
+    "3": ["гурав", "гурван", "gurav", "gurvan"],
+    "4": ["дөрөв", "дөрвөн", "dorov", "durvun"],
+    "5": ["тав", "таван", "tav", "tavan"],
+    "6": ["зургаа", "зургаан", "zurgaa", "zurgaan"],
+    "7": ["долоо", "долоон", "doloo", "doloon"],
+    "8": ["найм", "найман", "naim", "naiman"],
+    "9": ["ес", "есөн", "yesun"],
+    "10": ["арав", "арван", "arav", "arvan"],
+}
+
+# Дэс тооны нөхцөл ("1-р", "нэгдүгээр", "1 dugaar", "нэгдгр")
+ORDINAL_SUFFIXES = ["р", "r", "дугаар", "дүгээр", "dugaar", "dugeer", "dvgeer", "dgr", "дгр"]
+
+
+def fold(text):
+    return text.lower().translate(FOLD_TABLE)
+
+
+WORD_TO_NUM = {fold(w): n for n, words in NUMBER_WORDS.items() for w in words}
+ORDINAL_MARKERS = {fold(s) for s in ORDINAL_SUFFIXES}
+
+# Дэс тооны бүх хэлбэр энэ нэг тэмдэгт болно (context.json-д "r" байгаа)
+ORDINAL = "r"
+
+_number = "|".join(sorted(map(re.escape, WORD_TO_NUM), key=len, reverse=True))
+_ordinal = "|".join(sorted(map(re.escape, ORDINAL_MARKERS), key=len, reverse=True))
+NUMBER_PREFIX = re.compile(rf"(\d+|{_number})(-?(?:{_ordinal}))?")
+
+
+@lru_cache(maxsize=1 << 16)
+def token_key(token):
+    """
+    Үгийн эхний тоо (цифр эсвэл тооны үг) + дэс тоог нэгтгээд үлдсэн
+    залгаварыг хэвээр залгана: "tavand" → "5d", "нэгдүгээр" → "1r".
+    """
+    key = fold(token)
+    m = NUMBER_PREFIX.match(key)
+    if m is None:
+        return key
+    number = WORD_TO_NUM.get(m.group(1), m.group(1))
+    return number + (ORDINAL if m.group(2) else "") + key[m.end():]
+
+
+def key_tokens(tokens):
+    """
+    (түлхүүрүүд, spans): тоон дараах дэс тооны тусдаа үгийг тоотой нь
+    нийлүүлнэ ("1 р", "1 dugaar" → "1r").
+    spans[k] = (эхлэл, төгсгөл) - анхны tokens доторх байрлал.
+    """
+    keys = []
+    spans = []
+    for i, token in enumerate(tokens):
+        key = token_key(token)
+        if key in ORDINAL_MARKERS and keys and keys[-1].isdigit():
+            keys[-1] += ORDINAL
+            spans[-1] = (spans[-1][0], i + 1)
+            continue
+        keys.append(key)
+        spans.append((i, i + 1))
+    return keys, spans
+
+
+def phrase_keys(tokens):
+    return key_tokens(tokens)[0]
@@ -0,0 +1,189 @@
+import json
+import math
+import sys
+from collections import Counter
+
+import numpy as np
+
+# =========================================================
+# ============ OFFLINE REVERSE GEOCODER (POLYGONS) ========
+# =========================================================
+# Засаг захиргааны хилүүдийг (OSM-ээс гаргасан GeoJSON) ачаалж
+# lat/lon → (aimag, sum_duureg)-ийг интернетгүйгээр тодорхойлно.
+#
+# Индекс: жигд тор (CELL_DEG градусын нүд). Нүд бүрт тухайн нүдтэй
+# bbox нь давхцах полигонуудын дугаар хадгалагдана. Хайлт:
+# нүд → bbox шүүлт → ray casting (numpy).
+
+BOUNDARIES_FILE = "mongolia_admin_boundaries.geojson"
+CELL_DEG = 0.1
+
+# OSM admin_level → түвшин
+ADMIN_LEVELS = {
+    "4": "aimag",       # аймаг / нийслэл
+    "6": "sum_duureg",  # сум / дүүрэг
+    "8": "khoroo",      # хороо / баг
+}
+
+# Нэрийг эдгээр property-оос (эхнийх нь олдвол) авна
+NAME_KEYS = ("name:mn", "name")
+
+# =========================================================
+# ======================== LOAD ===========================
+# =========================================================
+def _ring(coords):
+    """
+    Цагирагийг ray casting-д бэлдэх: (xs, ys, өмнөх xs, өмнөх ys)
+    """
+    arr = np.asarray(coords, dtype=float)
+    xs, ys = arr[:, 0], arr[:, 1]
+    return xs, ys, np.roll(xs, 1), np.roll(ys, 1)
+
+
+def _polygons(geometry):
+    # Polygon / MultiPolygon → [[гадна цагираг, нүх, ...], ...]
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return geometry["coordinates"]
+    return []
+
+
+def _cell(cell_deg, x, y):
+    return math.floor(x / cell_deg), math.floor(y / cell_deg)
+
+
+def build_index(features, cell_deg=CELL_DEG):
+    """
+    GeoJSON feature-үүдээс торон индекс үүсгэх.
+    Буцаах dict: polygons [{level, name, bbox, rings}], grid {(cx, cy): [дугаар]}
+    """
+    polygons = []
+    grid = {}
+
+    for feature in features:
+        props = feature.get("properties") or {}
+        level = ADMIN_LEVELS.get(str(props.get("admin_level")))
+        name = next((props[k] for k in NAME_KEYS if props.get(k)), None)
+        if level is None or name is None or not feature.get("geometry"):
+            continue
+
+        for rings in _polygons(feature["geometry"]):
+            outer = np.asarray(rings[0], dtype=float)
+            bbox = (outer[:, 0].min(), outer[:, 1].min(), outer[:, 0].max(), outer[:, 1].max())
+
+            poly_id = len(polygons)
+            polygons.append({
+                "level": level,
+                "name": name,
+                "bbox": bbox,
+                "rings": [_ring(r) for r in rings],
+            })
+
+            x0, y0 = _cell(cell_deg, bbox[0], bbox[1])
+            x1, y1 = _cell(cell_deg, bbox[2], bbox[3])
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    grid.setdefault((cx, cy), []).append(poly_id)
+
+    return {"polygons": polygons, "grid": grid, "cell_deg": cell_deg}
+
+
+def load_boundaries(path=BOUNDARIES_FILE, cell_deg=CELL_DEG):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return build_index(data["features"], cell_deg)
+
+# =========================================================
+# ======================= LOOKUP ==========================
+# =========================================================
+def _in_ring(ring, x, y):
+    xs, ys, xj, yj = ring
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crosses = ((ys > y) != (yj > y)) & (x < (xj - xs) * (y - ys) / (yj - ys) + xs)
+    return bool(np.count_nonzero(crosses) & 1)
+
+
+def _in_polygon(poly, x, y):
+    x0, y0, x1, y1 = poly["bbox"]
+    if not (x0 <= x <= x1 and y0 <= y <= y1):
+        return False
+    outer, *holes = poly["rings"]
+    return _in_ring(outer, x, y) and not any(_in_ring(h, x, y) for h in holes)
+
+
+def locate(index, lat, lon):
+    """
+    lat/lon-г агуулах бүх түвшний нэр: {"aimag": ..., "sum_duureg": ..., "khoroo": ...}
+    """
+    x, y = float(lon), float(lat)
+    found = {}
+    for poly_id in index["grid"].get(_cell(index["cell_deg"], x, y), ()):
+        poly = index["polygons"][poly_id]
+        if poly["level"] not in found and _in_polygon(poly, x, y):
+            found[poly["level"]] = poly["name"]
+    return found
+
+
+def reverse(index, lat, lon):
+    """
+    region.py-ийн get_region_info-тэй ижил (aimag, sum_duureg).
+    Аймаг олдохгүй бол (хилийн гадна) None.
+    """
+    found = locate(index, lat, lon)
+    if "aimag" not in found:
+        return None
+    return found["aimag"], found.get("sum_duureg")
+
+# =========================================================
+# ============ AGREEMENT CHECK (NOMINATIM CACHE) ==========
+# =========================================================
+def _same(a, b):
+    return (a or "").strip().lower() == (b or "").strip().lower()
+
+
+def agreement(index, items):
+    """
+    items: (lat, lon, aimag, sum_duureg) - Nominatim-ийн хадгалсан хариултууд.
+    Offline хариулттай харьцуулсан тоо + зөрүүтэй жишээнүүд.
+    """
+    stats = Counter()
+    mismatches = []
+    for lat, lon, aimag, sum_duureg in items:
+        stats["total"] += 1
+        result = reverse(index, lat, lon)
+        if result is None:
+            stats["not_found"] += 1
+            continue
+        aimag_ok = _same(result[0], aimag)
+        sum_ok = _same(result[1], sum_duureg)
+        stats["aimag_match"] += aimag_ok
+        stats["sum_match"] += sum_ok
+        if not (aimag_ok and sum_ok):
+            mismatches.append({
+                "lat": lat, "lon": lon,
+                "nominatim": [aimag, sum_duureg],
+                "offline": list(result),
+            })
+    return stats, mismatches
+
+
+if __name__ == "__main__":
+    from geocode_cache import open_cache, cache_items, close_cache
+
+    boundaries_file = sys.argv[1] if len(sys.argv) > 1 else BOUNDARIES_FILE
+    index = load_boundaries(boundaries_file)
+    print(f"{len(index['polygons'])} полигон, {len(index['grid'])} нүд")
+
+    cache = open_cache()
+    stats, mismatches = agreement(index, cache_items(cache))
+    close_cache(cache)
+
+    total = stats["total"] or 1
+    print(f"Нийт: {stats['total']}, олдоогүй: {stats['not_found']}")
+    print(f"Аймаг таарсан: {stats['aimag_match']} ({100 * stats['aimag_match'] / total:.1f}%)")
+    print(f"Сум/дүүрэг таарсан: {stats['sum_match']} ({100 * stats['sum_match'] / total:.1f}%)")
+
+    with open("offline_mismatches.json", "w", encoding="utf-8") as f:
+        json.dump(mismatches, f, ensure_ascii=False, indent=2)
+    print("Зөрүүтэй координат: offline_mismatches.json")
@@ -1,15 +1,36 @@
 from geopy.geocoders import Nominatim
 from tqdm import tqdm
+import argparse
+import asyncio
 import json
+import os
+import sys
 import time
 
+from geocode_cache import open_cache, cache_contains, cache_get, cache_put, cache_stats, close_cache
+from geocode_client import parse_address, reverse_many
+from offline_geocoder import load_boundaries, reverse, BOUNDARIES_FILE
+
 # =========================
 # ТОХИРУУЛГА
 # =========================
 INPUT_FILE = "location_dictionary.json"
 OUTPUT_FILE = "location_dictionary_updated.json"
 FAILED_FILE = "reverse_failed.json"
+PROGRESS_FILE = "region_progress.jsonl"  # боловсруулсан түлхүүрүүд (append-only)
+FLUSH_EVERY = 200  # хэдэн түлхүүр тутамд OUTPUT_FILE-г шинэчлэх
 SLEEP_SECONDS = 1.1
+CACHE_FILE = "geocode_cache.sqlite"  # ажиллуулалт хооронд хадгалагдах cache
+CACHE_PRECISION = 5  # координатыг бөөрөнхийлөх орон (5 ≈ 1 метр)
+
+# "nominatim" - зөвхөн Nominatim
+# "offline"   - зөвхөн хилийн полигоноор (BOUNDARIES_FILE, интернетгүй)
+# "hybrid"    - эхлээд полигоноор, олдохгүй бол Nominatim
+GEOCODER = "nominatim"
+
+# True бол cache-д байхгүй координатуудыг geocode_client.py-ийн ENDPOINTS-оор
+# зэрэг урьдчилан татаж cache-д хийнэ; үндсэн давталт дараа нь cache-аас уншина
+PREFETCH = True
 
 # Nominatim тохиргоо
 geolocator = Nominatim(
@@ -17,10 +38,13 @@ geolocator = Nominatim(
     timeout=10
 )
 
-# Cache (давтагдсан координатад дахин request хийхгүй)
-cache = {}
+# Cache (давтагдсан координатад дахин request хийхгүй, диск дээр хадгалагдана)
+cache = open_cache(CACHE_FILE, CACHE_PRECISION)
 failed = []
 
+# Засаг захиргааны хилүүд (offline / hybrid горимд)
+boundaries = load_boundaries(BOUNDARIES_FILE) if GEOCODER != "nominatim" else None
+
 # =========================
 # ТУСЛАХ ФУНКЦ
 # =========================
@@ -36,12 +60,19 @@ def is_valid_coord(lat, lon):
 def get_region_info(lat, lon):
     """
     lat/lon → (aimag, sum_duureg)
+    Request амжилтгүй бол exception дамжуулна.
     """
-    key = f"{lat},{lon}"
+    if boundaries is not None:
+        result = reverse(boundaries, lat, lon)
+        if result is not None:
+            return result
+        if GEOCODER == "offline":
+            return ("Тодорхойгүй", "Тодорхойгүй")
 
     # Cache шалгах
-    if key in cache:
-        return cache[key]
+    cached = cache_get(cache, lat, lon)
+    if cached is not None:
+        return cached
 
     try:
         location = geolocator.reverse(
@@ -53,79 +84,211 @@ def get_region_info(lat, lon):
         if not location:
             result = ("Тодорхойгүй", "Тодорхойгүй")
         else:
-            address = location.raw.get("address", {})
-
-            # Аймаг / Хот
-            aimag = (
-                address.get("state")
-                or address.get("province")
-                or address.get("region")
-                or address.get("city")
-            )
-
-            # Сум / Дүүрэг
-            sum_duureg = (
-                address.get("county")
-                or address.get("district")
-                or address.get("suburb")
-                or address.get("town")
-                or address.get("village")
-            )
-
-            result = (aimag, sum_duureg)
-
-        cache[key] = result
+            result = parse_address(location.raw.get("address", {}))
+
+        cache_put(cache, lat, lon, *result)
         return result
 
-    except Exception as e:
+    finally:
+        # Rate limit (зөвхөн шинэ request дээр)
+        time.sleep(SLEEP_SECONDS)
+
+
+def save_json(path, obj):
+    # Тасалдсан ч хагас бичигдсэн файл үлдээхгүй
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def load_progress():
+    """
+    Өмнөх (тасалдсан) ажиллуулалтын явц: {түлхүүр: бичлэг}.
+    Сүүлд бичигдсэн мөр давуу эрхтэй; дутуу бичигдсэн сүүлийн мөрийг алгасна.
+    """
+    progress = {}
+    if not os.path.exists(PROGRESS_FILE):
+        return progress
+    with open(PROGRESS_FILE, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            progress[record["key"]] = record
+    return progress
+
+
+def apply_record(data, record):
+    data[record["key"]]["aimag"] = record["aimag"]
+    data[record["key"]]["sum"] = record["sum"]
+    if record.get("error"):
         failed.append({
-            "lat": lat,
-            "lon": lon,
-            "error": str(e)
+            "key": record["key"],
+            "lat": data[record["key"]].get("lat"),
+            "lon": data[record["key"]].get("lon"),
+            "error": record["error"]
         })
-        return None, None
+
+
+def process_key(data, location_key):
+    """
+    Нэг түлхүүрийг боловсруулж progress бичлэгийг буцаана.
+    """
+    lat = data[location_key].get("lat")
+    lon = data[location_key].get("lon")
+    record = {"key": location_key, "aimag": None, "sum": None}
+
+    # Координат шалгах
+    if not is_valid_coord(lat, lon):
+        return record
+
+    try:
+        record["aimag"], record["sum"] = get_region_info(lat, lon)
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+def prefetch(data, keys):
+    """
+    Nominatim шаардлагатай (offline-оор олдоогүй, cache-д байхгүй)
+    координатуудыг зэрэг татаж cache-д хадгална.
+    """
+    coords = []
+    for key in keys:
+        lat = data[key].get("lat")
+        lon = data[key].get("lon")
+        if not is_valid_coord(lat, lon):
+            continue
+        if boundaries is not None and (GEOCODER == "offline" or reverse(boundaries, lat, lon) is not None):
+            continue
+        if not cache_contains(cache, lat, lon):
+            coords.append((lat, lon))
+
+    if not coords:
+        return
+
+    print(f"{len(coords)} координатыг зэрэг татаж байна...")
+    results = asyncio.run(reverse_many(
+        coords,
+        on_result=lambda lat, lon, result: cache_put(cache, lat, lon, *result)
+    ))
+    n_failed = sum(isinstance(r, Exception) for r in results)
+    # Амжилтгүй координатуудыг үндсэн давталт geopy-оор дахин оролдоно
+    print(f"Урьдчилан татаж дууслаа, алдаа: {n_failed}")
+
+
+def flush(data, pending=None):
+    """
+    pending: --retry-failed горимд хараахан дахин оролдоогүй түлхүүрүүдийн
+    өмнөх алдааны бичлэг. Тасалдвал тэд FAILED_FILE-аас алдагдахгүй.
+    """
+    save_json(OUTPUT_FILE, data)
+    entries = failed + list((pending or {}).values())
+    if entries or os.path.exists(FAILED_FILE):
+        save_json(FAILED_FILE, entries)
+
+
+def retry_keys(data):
+    """
+    FAILED_FILE-ийн түлхүүрүүд: {түлхүүр: өмнөх алдааны бичлэг}
+    (түлхүүргүй хуучин бичлэгийг координатаар нь олно)
+    """
+    with open(FAILED_FILE, encoding="utf-8") as f:
+        entries = json.load(f)
+
+    by_coord = {}
+    for key, loc in data.items():
+        by_coord.setdefault((str(loc.get("lat")), str(loc.get("lon"))), []).append(key)
+
+    pending = {}
+    for entry in entries:
+        if entry.get("key") in data:
+            keys = [entry["key"]]
+        else:
+            keys = by_coord.get((str(entry.get("lat")), str(entry.get("lon"))), [])
+        for key in keys:
+            pending.setdefault(key, {**entry, "key": key})
+    return pending
 
 
 # =========================
 # ҮНДСЭН ПРОЦЕСС
 # =========================
+parser = argparse.ArgumentParser(description="Байршлын толь бичигт аймаг/сум нэмэх")
+parser.add_argument("--retry-failed", action="store_true",
+                    help=f"зөвхөн {FAILED_FILE}-д бүртгэгдсэн түлхүүрүүдийг дахин боловсруулах")
+parser.add_argument("--restart", action="store_true",
+                    help=f"{PROGRESS_FILE}-ийг үл тооцож эхнээс нь эхлэх")
+args = parser.parse_args()
+
 print("📍 Байршлын мэдээлэл тодорхойлж байна...")
 
-with open(INPUT_FILE, "r", encoding="utf-8") as f:
-    data = json.load(f)
+pending = None
 
-for location_key in tqdm(data.keys(), desc="Боловсруулж байна"):
-    lat = data[location_key].get("lat")
-    lon = data[location_key].get("lon")
+if args.retry_failed:
+    if not os.path.exists(FAILED_FILE):
+        print(f"{FAILED_FILE} олдсонгүй - дахин оролдох түлхүүр алга.")
+        close_cache(cache)
+        sys.exit(0)
 
-    # Координат шалгах
-    if not is_valid_coord(lat, lon):
-        data[location_key]["aimag"] = None
-        data[location_key]["sum"] = None
-        continue
+    # Өмнөх үр дүн дээр зөвхөн алдаатай түлхүүрүүдийг дахин тооцно
+    with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    pending = retry_keys(data)
+    keys = list(pending)
+    progress_log = None
+else:
+    with open(INPUT_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
 
-    cache_key = f"{lat},{lon}"
-    is_new_request = cache_key not in cache
+    if args.restart and os.path.exists(PROGRESS_FILE):
+        os.remove(PROGRESS_FILE)
 
-    aimag, sum_val = get_region_info(lat, lon)
+    # Өмнө боловсруулсан түлхүүрүүдийн үр дүнг сэргээгээд алгасна
+    progress = load_progress()
+    for record in progress.values():
+        if record["key"] in data:
+            apply_record(data, record)
+    if progress:
+        print(f"Өмнөх явцаас {len(progress)} түлхүүр сэргээв.")
 
-    data[location_key]["aimag"] = aimag
-    data[location_key]["sum"] = sum_val
+    keys = [key for key in data if key not in progress]
+    progress_log = open(PROGRESS_FILE, "a", encoding="utf-8")
 
-    # Rate limit (зөвхөн шинэ request дээр)
-    if is_new_request:
-        time.sleep(SLEEP_SECONDS)
+try:
+    if PREFETCH:
+        prefetch(data, keys)
+
+    for i, location_key in enumerate(tqdm(keys, desc="Боловсруулж байна"), 1):
+        record = process_key(data, location_key)
+        apply_record(data, record)
+        if pending is not None:
+            del pending[location_key]
+
+        if progress_log is not None:
+            progress_log.write(json.dumps(record, ensure_ascii=False) + "\n")
+            progress_log.flush()
+
+        if i % FLUSH_EVERY == 0:
+            flush(data, pending)
+finally:
+    if progress_log is not None:
+        progress_log.close()
+    close_cache(cache)
 
 # =========================
 # ФАЙЛУУД ХАДГАЛАХ
 # =========================
-with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-    json.dump(data, f, ensure_ascii=False, indent=2)
+flush(data)
 
-if failed:
-    with open(FAILED_FILE, "w", encoding="utf-8") as f:
-        json.dump(failed, f, ensure_ascii=False, indent=2)
+# Бүтэн ажиллуулалт дууссан тул явцын log шаардлагагүй
+if not args.retry_failed and os.path.exists(PROGRESS_FILE):
+    os.remove(PROGRESS_FILE)
 
 print("Амжилттай дууслаа!")
 print(f"Үр дүн: {OUTPUT_FILE}")
 print(f"Алдаатай координат: {len(failed)}")
+print(cache_stats(cache))
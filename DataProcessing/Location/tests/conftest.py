@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Скриптүүд шиг: Location/ болон DataProcessing/ доторх модулиудыг шууд import хийнэ
+HERE = os.path.dirname(os.path.abspath(__file__))
+LOCATION_DIR = os.path.dirname(HERE)
+sys.path[:0] = [LOCATION_DIR, os.path.dirname(LOCATION_DIR)]
+
+FIXTURES = os.path.join(HERE, "fixtures")
@@ -0,0 +1,53 @@
+import json
+
+import alias_index
+from alias_index import add_to_index, build_artifact, inputs_hash, load_artifact, read_artifact
+
+BAYANZURKH = {"canonical": "Баянзүрх дүүрэг", "type": "district"}
+
+
+def test_same_key_spellings_share_one_item():
+    index, seen = {}, {}
+    for alias in ["баянзүрх дүүрэг", "bayanzurh duureg", "баянзүрх  дүүрэг", "Bayanzurx duureg"]:
+        add_to_index(index, seen, alias, BAYANZURKH)
+    # өөр canonical, ижил түлхүүр: тусдаа item
+    add_to_index(index, seen, "баянзүрх дүүрэг", {"canonical": "Баянзүрх", "type": "common"})
+
+    items = [item for bucket in index.values() for item in bucket]
+    assert len(items) == 2
+    assert items[0]["aliases"] == ["баянзүрх дүүрэг", "bayanzurh duureg", "bayanzurx duureg"]
+    assert items[1]["canonical"] == "Баянзүрх"
+
+
+def test_unfolded_aliases_stay_separate():
+    index, seen = {}, {}
+    add_to_index(index, seen, "баянзүрх", BAYANZURKH, fold=False, alias_id=1)
+    add_to_index(index, seen, "bayanzurh", BAYANZURKH, fold=False, alias_id=2)
+    add_to_index(index, seen, "баянзүрх", BAYANZURKH, fold=False, alias_id=3)
+
+    assert sorted(index) == ["bayanzurh", "баянзүрх"]
+    assert index["баянзүрх"][0]["alias_id"] == 1
+
+
+def test_artifact_round_trip(tmp_path):
+    dictionary = tmp_path / "location_dictionary.json"
+    context = tmp_path / "context.json"
+    artifact_file = str(tmp_path / "location_index.bin")
+    dictionary.write_text(json.dumps({
+        "баянзүрх": {**BAYANZURKH, "aliases": ["баянзүрх дүүрэг", "bayanzurh duureg"]}
+    }, ensure_ascii=False), encoding="utf-8")
+    context.write_text(json.dumps({"location_context": {"prepositions": ["руу"]}}), encoding="utf-8")
+
+    built = build_artifact(str(dictionary), str(context), artifact_file)
+    digest = inputs_hash(str(dictionary), str(context), *alias_index.KEY_SOURCES)
+    loaded = read_artifact(artifact_file, digest)
+    assert loaded["index"] == built["index"]
+    assert loaded["context_words"] == built["context_words"]
+
+    # Өөр hash, тасарсан файл: дахин бүтээх шаардлагатай
+    assert read_artifact(artifact_file, b"\0" * 32) is None
+    with open(artifact_file, "r+b") as f:
+        f.truncate(alias_index.HEADER.size - 1)
+    assert read_artifact(artifact_file, digest) is None
+    assert load_artifact(str(dictionary), str(context), artifact_file)["index"] == built["index"]
+    assert read_artifact(artifact_file, digest)["index"] == built["index"]
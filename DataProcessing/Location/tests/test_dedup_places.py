@@ -0,0 +1,99 @@
+import random
+
+import numpy as np
+import pandas as pd
+
+from ExtractDict import cluster_places, dedup_places, lcs_length, similar_keys
+
+LONG_NAME = "Монгол улсын шинжлэх ухааны академийн физик технологийн хүрээлэнгийн байр"
+
+
+def places(rows):
+    # (нэр, өмнөд зүгт км) - бүгд нэг меридиан дээр
+    return pd.DataFrame({
+        "canonical": [name for name, _ in rows],
+        "norm_name": [name.lower() for name, _ in rows],
+        "type": "bus_stop",
+        "lat": [None if km is None else 47.9 - km / 111.0 for _, km in rows],
+        "lon": [None if km is None else 106.9 for _, km in rows],
+    })
+
+
+def same_cluster(rows):
+    labels = cluster_places(places(rows))
+    return bool(labels[0] == labels[1])
+
+
+def test_near_duplicate_pairs():
+    # ижил түлхүүр
+    assert same_cluster([("Хан-Уул", 0), ("хан уул", 1)])
+    # 1 засвар: 2 * 8 / 17 = 0.94
+    assert same_cluster([("Нарантуул", 0), ("Нарантул", 1)])
+    # 2 * 7 / 16 = 0.875
+    assert same_cluster([("Баянзүрх", 0), ("Баянзурх", 1)])
+    # хөрш сэлгэлт: 2 * LCS / (la + lb) = 0.857, SequenceMatcher.ratio 0.714 байсан
+    assert same_cluster([("Эрдэнэт", 0), ("Эрэндэт", 1)])
+
+
+def test_distinct_pairs_stay_apart():
+    # 2 * 4 / 12 = 0.67
+    assert not same_cluster([("Сансар", 0), ("Санчир", 1)])
+    # уртын зөрүү NAME_LENGTH_DIFF-ээс их
+    assert not same_cluster([("Зайсан", 0), ("Зайсан толгой", 1)])
+    # эхний үсэг өөр
+    assert not same_cluster([("Баянгол", 0), ("Аянгол", 1)])
+    # MERGE_DISTANCE_KM-ээс хол
+    assert not same_cluster([("Нарантуул", 0), ("Нарантуул", 10)])
+    # координатгүй мөр зөвхөн координатгүй, ижил түлхүүртэй мөртэй нийлнэ
+    assert not same_cluster([("Гандан", None), ("Гандан", 0)])
+    assert same_cluster([("Гандан", None), ("гандан", None)])
+
+
+def test_long_names_compared_in_full():
+    assert len(LONG_NAME) > 64
+    typo = LONG_NAME.replace("технологийн", "техналогийн")
+    assert same_cluster([(LONG_NAME, 0), (typo, 1)])
+    # түлхүүрийн эхний 64 тэмдэгт ижил, үлдсэн хэсэг нь өөр газар: 0.81
+    prefix = "Улаанбаатар хотын Сүхбаатар дүүргийн арван гуравдугаар хорооны нутаг дэвсгэр дэх "
+    assert not same_cluster([(prefix + "засаг даргын тамгын газар", 0), (prefix + "өрхийн эрүүл мэндийн төв", 1)])
+
+
+def test_dedup_places_variants():
+    out = dedup_places(places([
+        ("Нарантуул", 0), ("Нарантул", 0.5), ("Нарантуул", 1), ("Сансар", 0), ("Сансар", 20),
+    ]))
+    assert out["canonical"].tolist() == ["Нарантуул", "Сансар", "Сансар"]
+    assert out["count"].tolist() == [3, 1, 1]
+    assert out["variants"].tolist() == ["Нарантул", "", ""]
+
+
+def test_similar_keys_matches_plain_lcs():
+    rng = random.Random(3)
+    keys = set()
+    for _ in range(60):
+        key = "".join(rng.choice("абвгд") for _ in range(rng.choice([5, 12, 40, 63, 64, 65, 80])))
+        for _ in range(3):
+            chars = list(key)
+            for _ in range(rng.randint(0, 3)):
+                chars[rng.randrange(len(chars))] = rng.choice("абвгд")
+            keys.add("".join(chars))
+    keys = sorted(keys)
+
+    a, b = similar_keys(keys, 0.85)
+    found = {frozenset((keys[x], keys[y])) for x, y in zip(a, b)}
+    assert len(found) == len(a)
+
+    expected = {
+        frozenset((x, y))
+        for n, x in enumerate(keys) for y in keys[n + 1:]
+        if x[0] == y[0] and abs(len(x) - len(y)) <= 2
+        and 2 * lcs_length(x, y) / (len(x) + len(y)) >= 0.85
+    }
+    assert found == expected
+    assert any(max(len(x) for x in pair) > 64 for pair in expected)
+
+
+def test_cluster_labels_are_ints():
+    labels = cluster_places(places([("Нарантуул", 0), ("Сансар", 0), ("Гандан", None)]))
+    assert labels.dtype == np.int64
+    assert len(set(labels.tolist())) == 3
@@ -0,0 +1,141 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import ExtractDict
+from ExtractDict import fetch_overpass, iter_elements, iter_query_elements, parse_elements
+
+BUS_QUERY = '[out:json][timeout:60];node["highway"="bus_stop"]({bbox});out body;'
+FIXED_QUERY = BUS_QUERY.replace("{bbox}", "47.800000,106.700000,47.900000,106.900000")
+
+# 106.80 нь хоёр tile-ийн хил дээр - Overpass хоёуланд нь буцаана
+NODES = [
+    {"type": "node", "id": 1, "lat": 47.85, "lon": 106.75, "tags": {"highway": "bus_stop", "name": "Зайсан"}},
+    {"type": "node", "id": 2, "lat": 47.86, "lon": 106.80, "tags": {"highway": "bus_stop", "name": "Их тойруу"}},
+    {"type": "node", "id": 3, "lat": 47.87, "lon": 106.85, "tags": {"highway": "bus_stop", "name": "Нарантуул"}},
+    {"type": "node", "id": 4, "lat": 47.88, "lon": 106.86, "tags": {"highway": "bus_stop"}},
+]
+
+
+class OverpassStub(BaseHTTPRequestHandler):
+    # Overpass шиг: bbox доторх node-уудыг chunked хариултаар жижиг хэсгүүдээр
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        query = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+        self.server.queries.append((self.path, query))
+
+        if self.path == "/down":
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        south, west, north, east = map(float, re.search(r"\(([-\d.,]+)\)", query).group(1).split(","))
+        elements = [
+            n for n in NODES
+            if south <= n["lat"] <= north and west <= n["lon"] <= east
+        ]
+        body = json.dumps({"version": 0.6, "elements": elements}, ensure_ascii=False).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        # UTF-8 тэмдэгтийн дундуур ч таслагдана
+        for start in range(0, len(body), 50):
+            block = body[start:start + 50]
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(block), block))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def overpass(tmp_path, monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OverpassStub)
+    server.queries = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+
+    url = f"http://127.0.0.1:{server.server_port}"
+    # эхний сервер унасан: дараагийнх руу шилжинэ
+    monkeypatch.setattr(ExtractDict, "OVERPASS_URLS", [url + "/down", url + "/api/interpreter"])
+    monkeypatch.setattr(ExtractDict, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(ExtractDict, "SLEEP_BETWEEN_QUERIES", 0)
+    monkeypatch.setattr(ExtractDict, "DOWNLOAD_CHUNK", 16)
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def downloads(server):
+    return [query for path, query in server.queries if path == "/api/interpreter"]
+
+
+def test_cache_hit_skips_download(overpass):
+    path = fetch_overpass(FIXED_QUERY)
+    assert os.path.dirname(path) == ExtractDict.CACHE_DIR
+    assert [p for p, _ in overpass.queries] == ["/down", "/api/interpreter"]
+
+    assert fetch_overpass(FIXED_QUERY) == path
+    # whitespace-ээр ялгаатай ижил query ч cache-ээс
+    assert fetch_overpass("\n  " + FIXED_QUERY + "\n") == path
+    assert len(overpass.queries) == 2
+    assert not [name for name in os.listdir(ExtractDict.CACHE_DIR) if name.endswith(".tmp")]
+
+
+def test_expired_cache_downloads_again(overpass):
+    path = fetch_overpass(FIXED_QUERY)
+    old = time.time() - ExtractDict.CACHE_MAX_AGE - 60
+    os.utime(path, (old, old))
+
+    assert fetch_overpass(FIXED_QUERY) == path
+    assert len(downloads(overpass)) == 2
+    assert time.time() - os.path.getmtime(path) < 60
+
+
+def test_tile_border_elements_deduplicated(overpass, monkeypatch):
+    monkeypatch.setattr(ExtractDict, "TILED_QUERIES", {"bus_stop": (47.80, 106.70, 47.90, 106.90)})
+
+    elements = list(iter_query_elements("bus_stop", BUS_QUERY))
+
+    tiles = sorted(re.search(r"\((.*)\)", q).group(1) for q in downloads(overpass))
+    assert tiles == [
+        "47.800000,106.700000,47.900000,106.800000",
+        "47.800000,106.800000,47.900000,106.900000",
+    ]
+    assert [el["id"] for el in elements] == [1, 2, 3, 4]
+
+    rows = parse_elements(elements)
+    assert [row["canonical"] for row in rows] == ["Зайсан", "Их тойруу", "Нарантуул"]
+    assert {row["type"] for row in rows} == {"bus_stop"}
+
+
+def test_streamed_elements_parsed(overpass, monkeypatch):
+    path = fetch_overpass(FIXED_QUERY)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["elements"] == NODES
+
+    streamed = list(iter_elements(path))
+    assert streamed == NODES
+    assert isinstance(streamed[0]["lat"], float)
+
+    # ijson суугаагүй үед бүтэн json.load
+    monkeypatch.setitem(sys.modules, "ijson", None)
+    assert list(iter_elements(path)) == NODES
+
+
+def test_all_servers_failing_raises(overpass, monkeypatch):
+    monkeypatch.setattr(ExtractDict, "OVERPASS_URLS", ExtractDict.OVERPASS_URLS[:1])
+    with pytest.raises(RuntimeError):
+        fetch_overpass(FIXED_QUERY)
+    assert not os.path.exists(ExtractDict.cache_path(FIXED_QUERY))
@@ -0,0 +1,119 @@
+import pytest
+
+from alias_index import add_to_index
+from fuzzy_index import build_fuzzy_index, deletes, distance, lookup, max_distance
+from location_engine import make_engine, match_locations
+
+ALIASES = [
+    ("баянзүрх дүүрэг", "Баянзүрх дүүрэг", "district"),
+    ("хороолол", "Хороолол", "common"),
+    ("нарантуул зах", "Нарантуул", "place"),
+    ("зайсан", "Зайсан", "place"),
+    ("сансар", "Сансар", "place"),
+    ("зайсан сансар", "Зайсан сансар", "place"),
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    index, seen = {}, {}
+    for alias, canonical, kind in ALIASES:
+        add_to_index(index, seen, alias, {"canonical": canonical, "type": kind})
+    return index
+
+
+@pytest.fixture(scope="module")
+def engine(index):
+    # Хугацааны хязгааргүй: үр дүн машины хурдаас хамаарахгүй
+    return make_engine(index, ["хороо"], "suffix", fuzzy=True, fuzzy_budget=float("inf"))
+
+
+def found(text, engine):
+    return [(m["item"]["canonical"], m["text"], m.get("distance")) for m in match_locations(text, engine)]
+
+
+@pytest.mark.parametrize("a, b, limit, expected", [
+    ("zaisan", "zaisan", 2, 0),
+    ("zaisan", "zaysan", 2, 1),
+    ("zaisan", "zasian", 2, 1),       # хөрш сэлгэлт 1
+    ("zaisan", "zaisn", 2, 1),
+    ("kitten", "sitting", 3, 3),
+    ("ca", "abc", 3, 3),              # OSA: сэлгэсэн хэсгийг дахин засахгүй (Damerau бол 2)
+    ("kitten", "sitting", 2, None),
+    ("zaisan", "zaisanzah", 2, None),  # уртын зөрүү limit-ээс их
+])
+def test_distance(a, b, limit, expected):
+    assert distance(a, b, limit) == expected
+    assert distance(b, a, limit) == expected
+
+
+@pytest.mark.parametrize("word, expected", [
+    ("orон", 0),
+    ("zah", 0),
+    ("12345678", 0),
+    ("zaisan", 1),
+    ("narantu", 1),
+    ("horoolol", 2),
+    ("bayanzurh", 2),
+])
+def test_max_distance_by_length(word, expected):
+    assert max_distance(word) == expected
+
+
+def test_deletes():
+    assert deletes("abc", 1) == {"abc", "bc", "ac", "ab"}
+    assert deletes("abc", 2) == {"abc", "bc", "ac", "ab", "a", "b", "c"}
+
+
+def test_lookup(index):
+    fuzzy = build_fuzzy_index(index)
+    assert lookup(fuzzy, "zaisn") == [("zaisan", 1)]
+    assert lookup(fuzzy, "sansra") == [("sansar", 1)]
+    assert lookup(fuzzy, "baynzurhh") == [("bayanzurh", 2)]
+    # яг таарц, хэт богино үг, зөвхөн "common" alias-тай түлхүүр
+    assert lookup(fuzzy, "zaisan") == []
+    assert lookup(fuzzy, "zais") == []
+    assert lookup(fuzzy, "horolol") == []
+
+
+def test_lookup_finds_every_single_edit(index):
+    # Deletion индекс: 1 засвартай хэлбэр бүрээс эх түлхүүр олдоно
+    fuzzy = build_fuzzy_index(index)
+    alphabet = "aeiouhnrsz"
+    for word in fuzzy.keys() & index.keys():
+        variants = {word[:i] + word[i + 1:] for i in range(len(word))}
+        variants |= {word[:i] + c + word[i:] for i in range(len(word) + 1) for c in alphabet}
+        variants |= {word[:i] + c + word[i + 1:] for i in range(len(word)) for c in alphabet}
+        variants |= {word[:i] + word[i + 1] + word[i] + word[i + 2:] for i in range(len(word) - 1)}
+        for variant in variants - {word}:
+            if max_distance(variant):
+                assert (word, 1) in lookup(fuzzy, variant), variant
+
+
+def test_fuzzy_matches(engine):
+    assert found("baynzurh duureg zaisan", engine) == [
+        ("Баянзүрх дүүрэг", "baynzurh duureg", 1),
+        ("Зайсан", "zaisan", None),
+    ]
+    assert found("naranthuul zah", engine) == [("Нарантуул", "naranthuul zah", 1)]
+    assert found("хоролол", engine) == []
+
+
+def test_fuzzy_never_overrides_exact_span(engine):
+    # Яг таарц байхгүй бол хоёр үгтэй "Зайсан сансар" ойролцоогоор олдоно
+    assert found("зайсн сансыр", engine) == [("Зайсан сансар", "зайсн сансыр", 2)]
+    # "сансар" яг таарсан тул fuzzy түүний үгийг булаахгүй, зөвхөн өмнөх үгэнд хайна
+    assert found("зайсн сансар", engine) == [
+        ("Зайсан", "зайсн", 1),
+        ("Сансар", "сансар", None),
+    ]
+    assert found("сансар зайсн сансар", engine) == [
+        ("Сансар", "сансар", None),
+        ("Зайсан", "зайсн", 1),
+        ("Сансар", "сансар", None),
+    ]
+
+
+def test_zero_budget_keeps_exact_only(index):
+    engine = make_engine(index, ["хороо"], "suffix", fuzzy=True, fuzzy_budget=0)
+    assert found("baynzurh duureg zaisan", engine) == [("Зайсан", "zaisan", None)]
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import geocode_client
+from geocode_client import RetryableStatus, reverse_many
+
+
+class NominatimStub(BaseHTTPRequestHandler):
+    # Nominatim /reverse шиг: координатаа address-д буцаана.
+    # server.failures[path] - дараагийн request-үүдэд буцаах алдааны статусууд
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        lat, lon = query["lat"][0], query["lon"][0]
+        with self.server.lock:
+            self.server.requests.append((url.path, lat, lon, time.monotonic()))
+            failures = self.server.failures.get(url.path)
+            status = failures.pop(0) if failures else 200
+
+        time.sleep(self.server.delay)
+        body = b""
+        if status == 200:
+            address = {"state": f"aimag {lat}", "county": f"sum {lon}"}
+            body = json.dumps({"address": address}, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def nominatim(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), NominatimStub)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.failures = {}
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(geocode_client, "BACKOFF_SECONDS", 0.05)
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def endpoint(server, name, rate=1000.0, burst=10, concurrency=1):
+    return {
+        "name": name,
+        "url": f"{server.url}/{name}/reverse",
+        "rate": rate,
+        "burst": burst,
+        "concurrency": concurrency,
+    }
+
+
+def coords(n):
+    return [(47.9 + i * 0.001, 106.9) for i in range(n)]
+
+
+def expected(lat, lon):
+    return (f"aimag {lat}", f"sum {lon}")
+
+
+def test_token_bucket_limits_rate(nominatim):
+    # 20/сек, burst 1: 4 worker байсан ч request хоорондын зай ≥ 0.05 сек
+    points = coords(6)
+    results = asyncio.run(reverse_many(points, [endpoint(nominatim, "a", rate=20.0, burst=1, concurrency=4)]))
+
+    assert results == [expected(lat, lon) for lat, lon in points]
+    times = sorted(t for _, _, _, t in nominatim.requests)
+    assert len(times) == 6
+    assert times[-1] - times[0] >= 5 / 20 * 0.9
+
+
+def test_burst_allows_immediate_requests(nominatim):
+    points = coords(4)
+    start = time.monotonic()
+    asyncio.run(reverse_many(points, [endpoint(nominatim, "a", rate=1.0, burst=4, concurrency=4)]))
+    # rate 1/сек боловч 4-ийн нөөц тул хүлээхгүй
+    assert time.monotonic() - start < 0.9
+
+
+def test_retry_status_backs_off(nominatim):
+    nominatim.failures["/a/reverse"] = [503, 429]
+    (lat, lon), = coords(1)
+
+    results = asyncio.run(reverse_many([(lat, lon)], [endpoint(nominatim, "a")]))
+
+    assert results == [expected(lat, lon)]
+    times = [t for _, _, _, t in nominatim.requests]
+    assert len(times) == 3
+    # BACKOFF_SECONDS * 2^n: 0.05, дараа нь 0.1
+    assert times[1] - times[0] >= 0.05 * 0.9
+    assert times[2] - times[1] >= 0.1 * 0.9
+
+
+def test_retries_exhausted_returns_error(nominatim, monkeypatch):
+    monkeypatch.setattr(geocode_client, "MAX_RETRIES", 1)
+    nominatim.failures["/a/reverse"] = [503, 503, 503]
+    points = coords(1)
+    stored = []
+
+    results = asyncio.run(reverse_many(
+        points, [endpoint(nominatim, "a")],
+        on_result=lambda lat, lon, result: stored.append(result)
+    ))
+
+    assert isinstance(results[0], RetryableStatus)
+    assert len(nominatim.requests) == 2
+    assert stored == []
+
+
+def test_duplicate_coordinates_coalesced(nominatim):
+    # Эхний request хариу өгөхөөс өмнө ижил (бөөрөнхийлсөн) координатууд ирнэ
+    nominatim.delay = 0.1
+    lat, lon = 47.91234, 106.91234
+    points = [(lat, lon), (lat, lon), (lat + 1e-7, lon), (str(lat), str(lon)), (47.95, 106.95)]
+    stored = []
+
+    results = asyncio.run(reverse_many(
+        points, [endpoint(nominatim, "a", concurrency=4)],
+        on_result=lambda lat, lon, result: stored.append((lat, lon))
+    ))
+
+    assert results[:4] == [expected(lat, lon)] * 4
+    assert results[4] == expected(47.95, 106.95)
+    assert sorted((float(la), float(lo)) for _, la, lo, _ in nominatim.requests) == [(lat, lon), (47.95, 106.95)]
+    assert len(stored) == 2
+
+
+def test_requests_spread_across_endpoints(nominatim):
+    nominatim.delay = 0.05
+    points = coords(10)
+
+    results = asyncio.run(reverse_many(points, [endpoint(nominatim, "a"), endpoint(nominatim, "b")]))
+
+    # Дараалал хадгалагдана, endpoint бүр хэсгийг нь авна
+    assert results == [expected(lat, lon) for lat, lon in points]
+    paths = [path for path, _, _, _ in nominatim.requests]
+    assert len(paths) == 10
+    assert paths.count("/a/reverse") >= 3
+    assert paths.count("/b/reverse") >= 3
+
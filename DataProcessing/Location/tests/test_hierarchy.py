@@ -0,0 +1,75 @@
+import json
+from collections import Counter
+
+from hierarchy import (
+    new_hierarchy, add_node, freeze, save_hierarchy, load_hierarchy,
+    export_levels, level_items, node_id, parent_of, ancestor_of, rollup_counts,
+)
+from location_report import level_stats, UNKNOWN
+
+
+def small_store():
+    h = new_hierarchy()
+    add_node(h, "Монгол Улс", 1, lat=46.8625, lon=103.8467, location_type="country")
+    add_node(h, "Улаанбаатар", 2, parent=("Монгол Улс", 1), location_type="city")
+    add_node(h, "Хан-Уул дүүрэг", 3, parent=("Улаанбаатар", 2), location_type="district")
+    add_node(h, "Хан-Уул дүүрэг 1-р хороо", 4, parent=("Хан-Уул дүүрэг", 3))
+    add_node(h, "Зайсан", 5, parent=("Хан-Уул дүүрэг 1-р хороо", 4), lat=47.88, lon=106.91, location_type="bus_stop")
+    # level.py norm()-оор хадгалсан нэр (толь бичигт "Хан-Уул " гэж бичигдсэн)
+    add_node(h, "Хан-Уул", 5, parent=("Хан-Уул дүүрэг", 3), location_type="district")
+    add_node(h, "zaisan", 6, parent=("Зайсан", 5))
+    # давхардал нэмэгдэхгүй
+    add_node(h, "zaisan", 6, parent=("Зайсан", 5))
+    return freeze(h)
+
+
+def test_dedup_and_parent_lookup():
+    store = small_store()
+    assert len(store["name"]) == 7
+    zaisan = node_id(store, "Зайсан", 5)
+    khoroo = node_id(store, "Хан-Уул дүүрэг 1-р хороо", 4)
+    assert parent_of(store, zaisan) == khoroo
+    assert parent_of(store, node_id(store, "Монгол Улс", 1)) == -1
+    assert ancestor_of(store, zaisan, 2) == node_id(store, "Улаанбаатар", 2)
+    assert ancestor_of(store, node_id(store, "Хан-Уул", 5), 4) == -1
+
+
+def test_save_load_export_roundtrip(tmp_path):
+    store = small_store()
+    path = str(tmp_path / "h.npz")
+    save_hierarchy(store, path)
+    loaded = load_hierarchy(path)
+
+    export_levels(loaded, str(tmp_path / "level_{}.json"))
+    for lvl in range(1, 7):
+        with open(tmp_path / f"level_{lvl}.json", encoding="utf-8") as f:
+            assert json.load(f) == level_items(store, lvl)
+
+    level_5 = level_items(loaded, 5)
+    assert level_5[0]["parent"] == {"canonical": "Хан-Уул дүүрэг 1-р хороо", "level": 4}
+    assert level_5[1]["lat"] is None
+    assert "lat" not in level_items(loaded, 6)[0]
+
+
+def test_rollup_matches_trailing_space_canonical():
+    store = small_store()
+    # engine-ийн canonical толь бичгийнх шиг илүү зайтай ирнэ
+    counts = Counter({"Хан-Уул ": 3, "Зайсан": 2, "Байхгүй газар": 1})
+    rollups = rollup_counts(store, counts)
+
+    totals, unknown = rollups[3]
+    assert totals[node_id(store, "Хан-Уул дүүрэг", 3)] == 5
+    assert unknown == 1
+
+    # "Хан-Уул" хороогүй тул 4-р түвшинд тодорхойгүй
+    totals, unknown = rollups[4]
+    assert totals[node_id(store, "Хан-Уул дүүрэг 1-р хороо", 4)] == 2
+    assert unknown == 4
+
+
+def test_level_stats_rows():
+    store = small_store()
+    stats = level_stats(store, rollup_counts(store, Counter({"Хан-Уул ": 3, "Байхгүй газар": 1})), 2)
+    rows = dict(zip(stats["Байршил"], stats["Давтамж"]))
+    assert rows == {"Улаанбаатар": 3, UNKNOWN: 1}
+    assert stats["Эзлэх хувь (%)"].sum() == 100.0
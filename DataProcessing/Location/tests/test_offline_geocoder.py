@@ -0,0 +1,64 @@
+import os
+
+from conftest import FIXTURES
+from offline_geocoder import load_boundaries, locate, reverse, agreement
+from geocode_cache import open_cache, cache_put, cache_items, close_cache
+
+BOUNDARIES = os.path.join(FIXTURES, "admin_boundaries.geojson")
+
+
+def test_index_skips_unknown_levels_and_names():
+    index = load_boundaries(BOUNDARIES)
+    # улс (admin_level 2) болон нэргүй feature орохгүй, MultiPolygon 2 полигон
+    names = [poly["name"] for poly in index["polygons"]]
+    assert names == ["Төв аймаг", "Улаанбаатар", "Сонгинохайрхан", "Сонгинохайрхан", "Зуунмод", "1-р хороо"]
+
+
+def test_reverse_polygon_with_hole():
+    index = load_boundaries(BOUNDARIES)
+    # Төв аймгийн нүхэнд (Улаанбаатар) байгаа цэг Төвд орохгүй
+    assert reverse(index, 47.6, 107.2) == ("Улаанбаатар", None)
+    assert reverse(index, 47.1, 106.9) == ("Төв аймаг", "Зуунмод")
+    assert reverse(index, 48.4, 107.9) == ("Төв аймаг", None)
+
+
+def test_reverse_multipolygon_parts():
+    index = load_boundaries(BOUNDARIES)
+    assert reverse(index, 47.95, 106.75) == ("Улаанбаатар", "Сонгинохайрхан")
+    assert reverse(index, 47.62, 106.6) == ("Улаанбаатар", "Сонгинохайрхан")
+    # хоёр хэсгийн хооронд
+    assert reverse(index, 47.78, 106.6) == ("Улаанбаатар", None)
+
+
+def test_locate_all_levels_and_out_of_bounds():
+    index = load_boundaries(BOUNDARIES, cell_deg=0.05)
+    assert locate(index, 47.92, 106.68) == {
+        "aimag": "Улаанбаатар", "sum_duureg": "Сонгинохайрхан", "khoroo": "1-р хороо",
+    }
+    assert locate(index, 45.5, 100.5) == {}
+    assert reverse(index, 45.5, 100.5) is None
+    assert reverse(index, 10.0, -20.0) is None
+
+
+def test_agreement_against_cached_answers(tmp_path):
+    index = load_boundaries(BOUNDARIES)
+    cache = open_cache(str(tmp_path / "geocode_cache.sqlite"))
+    cache_put(cache, 47.1, 106.9, "төв аймаг ", "Зуунмод")
+    cache_put(cache, 47.95, 106.75, "Улаанбаатар", "Сонгинохайрхан")
+    cache_put(cache, 47.6, 107.2, "Улаанбаатар", "Баянзүрх")
+    cache_put(cache, 45.5, 100.5, "Говь-Алтай", None)
+    # өөр эх сурвалжийн хариулт тооцогдохгүй
+    cache_put(cache, 47.3, 107.5, "Төв аймаг", None, source="offline")
+
+    stats, mismatches = agreement(index, cache_items(cache))
+    close_cache(cache)
+
+    assert stats["total"] == 4
+    assert stats["not_found"] == 1
+    assert stats["aimag_match"] == 3
+    assert stats["sum_match"] == 2
+    assert mismatches == [{
+        "lat": 47.6, "lon": 107.2,
+        "nominatim": ["Улаанбаатар", "Баянзүрх"],
+        "offline": ["Улаанбаатар", None],
+    }]
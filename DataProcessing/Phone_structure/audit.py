@@ -1,16 +1,22 @@
 import pandas as pd
 
-df = pd.read_csv("with_phone_extracted.csv", encoding="utf-8-sig")
+from extract_phones import OUTPUT_FILE, SUSPICIOUS_FILE, PHONE_COLUMN, REASON_TEXT
+from post_io import iter_post_chunks
 
 end_row = 9000
-end_row = min(end_row, len(df) - 1)
 
-out = df.loc[0:end_row, ["Final"]].copy()
+# Эхний end_row хүртэлх мөрийн утаснууд (Parquet-аас хэсэгчлэн уншина)
+rows = []
+for chunk in iter_post_chunks(OUTPUT_FILE, columns=[PHONE_COLUMN]):
+    for phones in chunk[PHONE_COLUMN]:
+        if len(rows) > end_row:
+            break
+        # NaN 
+        rows.append(", ".join(str(p) for p in phones) if phones is not None and len(phones) else "NaN")
+    if len(rows) > end_row:
+        break
 
-# NaN 
-out["Final"] = out["Final"].fillna("NaN").astype(str).str.strip()
-
-#
+out = pd.DataFrame({"Final": rows})
 
 out.to_csv(
     "extracted_numbers_0_9000.csv",
@@ -21,3 +27,10 @@ out.to_csv(
 
 print("Saved:", "extracted_numbers_0_9000.csv")
 
+# Сэжигтэй дугаарууд: шалтгааны код → текст
+sus = pd.read_parquet(SUSPICIOUS_FILE)
+sus["reason"] = sus["reason"].map(REASON_TEXT)
+sus.to_csv("suspicious_numbers.csv", index=False, encoding="utf-8-sig")
+
+print(sus["reason"].value_counts().to_string())
+print("Saved:", "suspicious_numbers.csv")
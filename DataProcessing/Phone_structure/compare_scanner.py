@@ -0,0 +1,34 @@
+import sys
+
+from extract_phones import INPUT_FILE, CHUNK_SIZE, content_column_name, process_row, scan_phones
+from post_io import iter_post_chunks
+
+# scan_phones (fused) болон process_row (анхны олон дамжилттай) хоёрын
+# үр дүнг бодит постууд дээр мөр бүрээр харьцуулна.
+# Зөрүүтэй мөрүүдийг scanner_mismatches.csv-д хадгална.
+
+MISMATCH_FILE = "scanner_mismatches.csv"
+
+rows = []
+total = 0
+for chunk in iter_post_chunks(INPUT_FILE, CHUNK_SIZE, columns=[content_column_name]):
+    for idx, content in zip(chunk.index, chunk[content_column_name]):
+        expected = process_row(content)
+        actual = scan_phones(content)
+        if expected != actual:
+            rows.append({
+                "row": idx,
+                "content": content,
+                "process_row": expected,
+                "scan_phones": actual,
+            })
+    total += len(chunk)
+
+print(f"Нийт {total} мөр, зөрүү: {len(rows)}")
+
+if rows:
+    import pandas as pd
+
+    pd.DataFrame(rows).to_csv(MISMATCH_FILE, index=False, encoding="utf-8-sig")
+    print("Saved:", MISMATCH_FILE)
+    sys.exit(1)
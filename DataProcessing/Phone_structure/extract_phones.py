@@ -1,12 +1,25 @@
+import os
 import re
+import sys
+
 import pandas as pd
 
-# Файлын нэрсийг тохируулах
-INPUT_FILE = "posts_with_locations_final.xlsx"
-OUTPUT_FILE = "with_phone_extracted.xlsx"
+# DataProcessing/ доторх нийтлэг модулиуд (post_io.py, parallel.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from parallel import map_shards, MIN_PARALLEL
+from post_io import iter_post_chunks, write_chunks
 
-# Excel файлыг унших
-df = pd.read_excel(INPUT_FILE)
+# Файлын нэрсийг тохируулах
+INPUT_FILE = "posts_with_locations_final.parquet"
+OUTPUT_FILE = "with_phone_extracted.parquet"  # Web/scripts/script.py-ийн оролт
+SUSPICIOUS_FILE = "suspicious_numbers.parquet"  # (row, token, reason) - audit-д
+EXCEL_EXPORT_FILE = "with_phone_extracted.xlsx"  # None бол Excel гаргахгүй
+CHUNK_SIZE = 10000  # нэг удаад боловсруулах мөрийн тоо
+# "scan"   - нэг дамжилттай fused scanner (scan_phones)
+# "column" - баганаар нь нэг дор (extract_column)
+# "row"    - мөр бүрээр (process_row)
+EXTRACT_MODE = "scan"
+WORKERS = None  # "scan"/"column" горимын процессын тоо (None = бүх цөм, 1 = serial)
 
 # --- Phase 1: Patterns ---
 
@@ -43,6 +56,36 @@ nine_pattern = re.compile(r"\b\d{9}\b")
 ten_pattern  = re.compile(r"\b\d{10}\b")
 long_digit_pattern = re.compile(r"\d{18,}")
 
+# --- Suspicious reason codes ---
+# Parquet-д uint8 код хэлбэрээр хадгалж, Excel экспортод текст болгоно.
+
+REASON_IP = 1
+REASON_LONG = 2
+REASON_NINE_TRIMMED = 3
+REASON_NINE_UNKNOWN = 4
+REASON_TEN_FIRST8 = 5
+REASON_TEN_LAST8 = 6
+REASON_TEN_BANK = 7
+REASON_ENDS_0000 = 8
+REASON_MANY_ZEROS = 9
+
+REASON_TEXT = {
+    REASON_IP: "IP address detected",
+    REASON_LONG: "18+ digit contiguous",
+    REASON_NINE_TRIMMED: "9-digit trimmed",
+    REASON_NINE_UNKNOWN: "9-digit unknown",
+    REASON_TEN_FIRST8: "10-digit used first8",
+    REASON_TEN_LAST8: "10-digit used last8",
+    REASON_TEN_BANK: "10-digit bank/account",
+    REASON_ENDS_0000: "Endswith 0000",
+    REASON_MANY_ZEROS: "Too many zeros",
+}
+
+# Гаралтын баганууд ба тэдгээрийн Parquet төрөл
+PHONE_COLUMN = "extracted phone number"
+SUSPICIOUS_COLUMN = "suspicious number"
+OUTPUT_TYPES = {PHONE_COLUMN: "list<uint32>", SUSPICIOUS_COLUMN: "list<suspicious>"}
+
 def digits_only(s: str) -> str:
     return re.sub(r"\D", "", str(s))
 
@@ -63,7 +106,7 @@ def mask_ip_addresses(t: str):
     if not ips:
         return t, []
     t2 = ip_pattern.sub(" <IPADDR> ", t)
-    sus = [{"token": x, "reason": "IP address detected"} for x in ips]
+    sus = [{"token": x, "reason": REASON_IP} for x in ips]
     return t2, sus
 
 def mask_long_numbers(t: str):
@@ -71,7 +114,7 @@ def mask_long_numbers(t: str):
     if not longs:
         return t, []
     t2 = long_digit_pattern.sub(" <LONGNUM> ", t)
-    sus = [{"token": x, "reason": "18+ digit contiguous"} for x in longs]
+    sus = [{"token": x, "reason": REASON_LONG} for x in longs]
     return t2, sus
 
 # --- Phase 3: Extraction ---
@@ -116,9 +159,9 @@ def normalize_and_apply_rules(product_nums, strict_matches, nines, tens, suspici
         picked = first8 if is_mn_phone8(first8) else (last8 if is_mn_phone8(last8) else None)
         if picked:
             phones.append(picked)
-            suspicious.append({"token": m, "reason": "9-digit trimmed"})
+            suspicious.append({"token": m, "reason": REASON_NINE_TRIMMED})
         else:
-            suspicious.append({"token": m, "reason": "9-digit unknown"})
+            suspicious.append({"token": m, "reason": REASON_NINE_UNKNOWN})
 
     for m in tens:
         first8 = m[:8]
@@ -127,31 +170,29 @@ def normalize_and_apply_rules(product_nums, strict_matches, nines, tens, suspici
         l_ok = is_mn_phone8(last8)
         if f_ok:
             phones.append(first8)
-            suspicious.append({"token": m, "reason": "10-digit used first8"})
+            suspicious.append({"token": m, "reason": REASON_TEN_FIRST8})
         elif l_ok:
             phones.append(last8)
-            suspicious.append({"token": m, "reason": "10-digit used last8"})
+            suspicious.append({"token": m, "reason": REASON_TEN_LAST8})
         else:
-            suspicious.append({"token": m, "reason": "10-digit bank/account"})
+            suspicious.append({"token": m, "reason": REASON_TEN_BANK})
 
     phones = list(dict.fromkeys([p for p in phones if is_mn_phone8(p)]))
 
     for p in phones:
         if last4_all_zero(p):
-            suspicious.append({"token": p, "reason": "Endswith 0000"})
+            suspicious.append({"token": p, "reason": REASON_ENDS_0000})
         if too_many_zeros(p, min_zeros=5):
-            suspicious.append({"token": p, "reason": "Too many zeros"})
+            suspicious.append({"token": p, "reason": REASON_MANY_ZEROS})
 
-    final_phones_str = ", ".join(phones) if phones else None
-    suspicious_str = ", ".join([f"{s['token']} ({s['reason']})" for s in suspicious]) if suspicious else None
-    
-    return final_phones_str, suspicious_str
+    # 8 оронтой дугаар uint32-д багтана (string-ээс хамаагүй бага санах ой)
+    return [int(p) for p in phones], suspicious
 
 # --- Phase 5: Pipeline ---
 
 def process_row(content):
     if pd.isna(content) or content is None:
-        return None, None
+        return [], []
 
     original = str(content)
     product_nums = extract_product_split_numbers(original)
@@ -165,23 +206,205 @@ def process_row(content):
 
     return normalize_and_apply_rules(product_nums, strict_matches, nines, tens, mask_sus)
 
+# --- Phase 6: Column-level pipeline ---
+
+def extract_column(contents):
+    """
+    process_row-тай ижил үр дүнг бүхэл баганаар тооцох: regex алхам бүрийг
+    pandas-ийн str.replace / str.findall-аар нэг дор ажиллуулж, зөвхөн
+    эцсийн дүрмүүдийг (normalize_and_apply_rules) мөр бүрээр хийнэ.
+    """
+    s = pd.Series(list(contents), dtype=object)
+    valid = s.notna()
+    results = [([], [])] * len(s)
+    if not valid.any():
+        return results
+
+    original = s[valid].astype(str)
+    product_nums = original.str.findall(product_split_pattern)
+
+    t = original.str.replace(o_to_zero_pattern, "0", regex=True)
+    t = t.str.replace(url_pattern, " ", regex=True)
+    t = t.str.replace(product_attached_pattern, " ", regex=True)
+
+    ips = t.str.findall(ip_pattern)
+    t = t.str.replace(ip_pattern, " <IPADDR> ", regex=True)
+    longs = t.str.findall(long_digit_pattern)
+    t = t.str.replace(long_digit_pattern, " <LONGNUM> ", regex=True)
+
+    strict = t.str.findall(phone_pattern)
+    nines = t.str.findall(nine_pattern)
+    tens = t.str.findall(ten_pattern)
+
+    positions = valid.to_numpy().nonzero()[0]
+    for pos, prod, ip, long_, st, ni, te in zip(positions, product_nums, ips, longs, strict, nines, tens):
+        mask_sus = (
+            [{"token": x, "reason": REASON_IP} for x in ip]
+            + [{"token": x, "reason": REASON_LONG} for x in long_]
+        )
+        results[pos] = normalize_and_apply_rules(
+            [x for x in prod if is_mn_phone8(x)], st, ni, te, mask_sus
+        )
+    return results
+
+
+def extract_phone_columns(contents, workers=WORKERS):
+    """
+    Баганыг процессуудад тэнцүү хувааж extract_column-ийг ажиллуулна
+    (мөрийн дараалал хадгалагдана). Жижиг оролтыг шууд тооцно.
+    """
+    contents = list(contents)
+    n_workers = workers or os.cpu_count() or 1
+    if n_workers <= 1 or len(contents) < MIN_PARALLEL:
+        return extract_column(contents)
+
+    size = -(-len(contents) // n_workers)
+    shards = [contents[i:i + size] for i in range(0, len(contents), size)]
+    parts = map_shards(extract_column, shards, workers=n_workers, min_parallel=2)
+    return [result for part in parts for result in part]
+
+# --- Phase 7: Fused single-pass scanner ---
+
+# Дугаар/IP/урт тоо зөвхөн цифр, "+", зай, "-", ".", "•"-ээс бүрдсэн
+# тасралтгүй хэсэгт (digit run) л байж болно.
+digit_pattern = re.compile(r"\d")
+digit_run_pattern = re.compile(r"[\d+][\d+\s\-\.\•]*")
+
+MIN_RUN_LEN = 7  # хамгийн богино боломжит тохирол: IP "1.2.3.4"
+
+
+def is_candidate(text: str) -> bool:
+    """
+    Хямд шүүлтүүр: дугаар (8 цифр), IP (4 цифр + 3 цэг) аль нь ч
+    багтах боломжгүй постыг шууд алгасна. o→0 хөрвүүлэлтийг тооцож
+    "o"/"O"-г мөн цифрт тооцно; жинхэнэ цифр дор хаяж нэг байх ёстой.
+    """
+    n_digits = len(digit_pattern.findall(text))
+    if n_digits == 0:
+        return False
+    n_digits += text.count("o") + text.count("O")
+    if n_digits < 4:
+        return False
+    return n_digits >= 8 or text.count(".") >= 3
+
+
+def scan_phones(content):
+    """
+    process_row-тай ижил үр дүн: o→0, URL/product-ийг зөвхөн тухайн тэмдэгт
+    байвал арилгаж, дараа нь текстийг зүүнээс баруун тийш нэг удаа гүйж
+    digit run бүрийг (IP, 18+ урт тоо, утас, 9/10 оронтой) ангилна.
+    """
+    if pd.isna(content) or content is None:
+        return [], []
+
+    original = str(content)
+    if not is_candidate(original):
+        return [], []
+
+    product_nums = extract_product_split_numbers(original) if "/" in original else []
+
+    t = original
+    if "o" in t or "O" in t:
+        t = o_to_zero_pattern.sub("0", t)
+    if "http" in t:
+        t = url_pattern.sub(" ", t)
+    if "/" in t:
+        t = product_attached_pattern.sub(" ", t)
+
+    ips, longs, strict_matches, nines, tens = [], [], [], [], []
+
+    for run in digit_run_pattern.finditer(t):
+        start, end = run.span()
+        if end - start < MIN_RUN_LEN:
+            continue
+
+        # \b шалгалтад хэрэгтэй хөрш тэмдэгтийг оролцуулна
+        w = t[max(start - 1, 0):end + 1]
+
+        if "." in w:
+            found = ip_pattern.findall(w)
+            if found:
+                ips.extend(found)
+                w = ip_pattern.sub(" <IPADDR> ", w)
+
+        if end - start >= 18:
+            found = long_digit_pattern.findall(w)
+            if found:
+                longs.extend(found)
+                w = long_digit_pattern.sub(" <LONGNUM> ", w)
+
+        strict_matches.extend(phone_pattern.findall(w))
+        nines.extend(nine_pattern.findall(w))
+        tens.extend(ten_pattern.findall(w))
+
+    mask_sus = (
+        [{"token": x, "reason": REASON_IP} for x in ips]
+        + [{"token": x, "reason": REASON_LONG} for x in longs]
+    )
+
+    if not (product_nums or mask_sus or strict_matches or nines or tens):
+        return [], []
+
+    return normalize_and_apply_rules(product_nums, strict_matches, nines, tens, mask_sus)
+
 # Гүйцэтгэх
-extracted_col = []
-suspicious_col = []
 
 # "Content" багана байгаа эсэхийг шалгах (Баганын нэр өөр бол энд солино уу)
 content_column_name = "Content" 
 
-for idx, row in df.iterrows():
-    extracted, suspicious = process_row(row.get(content_column_name))
-    extracted_col.append(extracted)
-    suspicious_col.append(suspicious)
+def extracted_chunks(suspicious_rows):
+    # Файлыг хэсэгчлэн уншиж, хэсэг бүрийг боловсруулмагц бичнэ
+    for chunk in iter_post_chunks(INPUT_FILE, CHUNK_SIZE):
+        contents = chunk[content_column_name] if content_column_name in chunk else [None] * len(chunk)
+        if EXTRACT_MODE == "scan":
+            results = map_shards(scan_phones, contents, WORKERS)
+        elif EXTRACT_MODE == "column":
+            results = extract_phone_columns(contents)
+        else:
+            results = [process_row(content) for content in contents]
+
+        # Шинэ багануудыг нэмэх
+        chunk[PHONE_COLUMN] = [extracted for extracted, _ in results]
+        chunk[SUSPICIOUS_COLUMN] = [suspicious for _, suspicious in results]
+
+        # Audit-д зориулж сэжигтэй дугааруудыг файлын мөрийн дугаартай нь цуглуулна
+        for row, (_, suspicious) in zip(chunk.index, results):
+            for s in suspicious:
+                suspicious_rows.append((row, s["token"], s["reason"]))
+        yield chunk
+
+
+def suspicious_text(items):
+    """[{"token", "reason"}] → "token (шалтгаан), ..." (Excel-д)"""
+    if items is None or len(items) == 0:
+        return None
+    return ", ".join(f"{s['token']} ({REASON_TEXT[s['reason']]})" for s in items)
+
+
+def readable_chunks(path):
+    # Шалтгааны кодыг текст болгож Excel экспортод бэлдэнэ
+    for chunk in iter_post_chunks(path, CHUNK_SIZE):
+        chunk[SUSPICIOUS_COLUMN] = chunk[SUSPICIOUS_COLUMN].map(suspicious_text)
+        yield chunk
+
+
+def main():
+    # Үр дүнг Parquet болгож хадгалах (утас - uint32 жагсаалт, сэжигтэй - struct жагсаалт)
+    suspicious_rows = []
+    total = write_chunks(OUTPUT_FILE, extracted_chunks(suspicious_rows), types=OUTPUT_TYPES)
+
+    write_chunks(
+        SUSPICIOUS_FILE,
+        [pd.DataFrame(suspicious_rows, columns=["row_index", "token", "reason"])],
+        types={"row_index": "int64", "token": "string", "reason": "uint8"}
+    )
+
+    if EXCEL_EXPORT_FILE:
+        write_chunks(EXCEL_EXPORT_FILE, readable_chunks(OUTPUT_FILE))
 
-# Шинэ багануудыг нэмэх
-df["extracted phone number"] = extracted_col
-df["suspicious number"] = suspicious_col
+    print(f"Боловсруулалт дууслаа. {total} мөрийн үр дүнг '{OUTPUT_FILE}' файлд хадгалав.")
+    print(f"Сэжигтэй {len(suspicious_rows)} дугаарыг '{SUSPICIOUS_FILE}' файлд хадгалав.")
 
-# Үр дүнг Excel файл болгож хадгалах
-df.to_excel(OUTPUT_FILE, index=False)
 
-print(f"Боловсруулалт дууслаа. Үр дүнг '{OUTPUT_FILE}' файлд хадгалав.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import multiprocessing as mp
+import os
+
+# =========================================================
+# ============ PROCESS POOL (FORK / COPY-ON-WRITE) ========
+# =========================================================
+# Ажлын функц болон оролтын жагсаалтыг pool үүсгэхээс өмнө модулийн
+# хувьсагчид хадгална. "fork" горимд хүүхэд процессууд тэдгээрийг
+# copy-on-write-аар шууд хуваалцах тул task бүрт зөвхөн (start, end)
+# индекс дамжуулна; alias индекс гэх мэт том бүтэц pickle хийгдэхгүй.
+
+MIN_PARALLEL = 2000      # үүнээс цөөн мөрийг шууд (serial) боловсруулна
+SHARDS_PER_WORKER = 4    # ачааллыг тэнцүүлэхийн тулд процесс бүрт олон хэсэг
+
+_task = None
+
+
+def _run_shard(bounds):
+    func, items = _task
+    start, end = bounds
+    return [func(x) for x in items[start:end]]
+
+
+def fork_available():
+    return "fork" in mp.get_all_start_methods()
+
+
+def map_shards(func, items, workers=None, min_parallel=MIN_PARALLEL):
+    """
+    [func(x) for x in items]-тай ижил үр дүнг (дарааллаа хадгалан)
+    олон процессоор тооцоолох.
+    workers: процессын тоо (None = бүх цөм, 1 = serial)
+    fork боломжгүй (Windows) эсвэл жижиг оролттой үед serial ажиллана.
+    """
+    global _task
+
+    items = list(items)
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(items))
+
+    if workers <= 1 or len(items) < min_parallel or not fork_available():
+        return [func(x) for x in items]
+
+    n_shards = workers * SHARDS_PER_WORKER
+    size = -(-len(items) // n_shards)
+    bounds = [(start, min(start + size, len(items))) for start in range(0, len(items), size)]
+
+    _task = (func, items)
+    try:
+        with mp.get_context("fork").Pool(workers) as pool:
+            parts = pool.map(_run_shard, bounds)
+    finally:
+        _task = None
+
+    return [result for part in parts for result in part]
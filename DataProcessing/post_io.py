@@ -0,0 +1,328 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+# =========================================================
+# ============== STREAMING POSTS READER / WRITER ==========
+# =========================================================
+# Постуудыг бүхэлд нь санах ойд ачаалахгүйгээр тогтмол хэмжээтэй
+# хэсгүүдээр (chunk) уншиж, боловсруулсан хэсэг бүрийг шууд бичнэ.
+# Дэмжих формат: .xlsx (read-only / write-only), .csv, .parquet
+#
+# Үе шат хоорондын үндсэн формат нь Parquet: жагсаалт төрлийн багана
+# (matched_locations, утасны дугаарууд) string болж алдагдахгүй.
+# Excel нь зөвхөн хүнд зориулсан эцсийн экспорт.
+
+CHUNK_SIZE = 10000
+
+# write_chunks(types=...)-д ашиглах Arrow төрлүүд
+ARROW_TYPES = {
+    "string": lambda pa: pa.string(),
+    "int64": lambda pa: pa.int64(),
+    "list<string>": lambda pa: pa.list_(pa.string()),
+    "uint8": lambda pa: pa.uint8(),
+    "list<uint32>": lambda pa: pa.list_(pa.uint32()),
+    # extract_phones.py: [{"token": "...", "reason": код}, ...]
+    "list<suspicious>": lambda pa: pa.list_(pa.struct([("token", pa.string()), ("reason", pa.uint8())])),
+}
+
+
+def file_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        return "xlsx"
+    if ext == ".csv":
+        return "csv"
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    raise ValueError(f"Дэмжигдээгүй файлын формат: {path}")
+
+# =========================================================
+# ======================= READERS =========================
+# =========================================================
+def _iter_xlsx(path, chunk_size, columns):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        batch = []
+        empty = True
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                yield _frame(batch, header, columns)
+                batch = []
+                empty = False
+        # Зөвхөн толгойтой файл ч багануудаа хоосон хэсгээр дамжуулна
+        if batch or empty:
+            yield _frame(batch, header, columns)
+    finally:
+        wb.close()
+
+
+def _frame(batch, header, columns):
+    df = pd.DataFrame(batch, columns=header)
+    return df[columns] if columns else df
+
+
+def _iter_csv(path, chunk_size, columns):
+    yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns, encoding="utf-8-sig")
+
+
+def _iter_parquet(path, chunk_size, columns):
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path)
+    if pf.metadata.num_rows == 0:
+        # iter_batches юу ч буцаахгүй: schema-тай хоосон хэсэг
+        table = pf.schema_arrow.empty_table()
+        yield (table.select(columns) if columns else table).to_pandas()
+        return
+    for batch in pf.iter_batches(batch_size=chunk_size, columns=columns):
+        yield batch.to_pandas()
+
+
+READERS = {"xlsx": _iter_xlsx, "csv": _iter_csv, "parquet": _iter_parquet}
+
+
+def iter_post_chunks(path, chunk_size=CHUNK_SIZE, columns=None):
+    """
+    Файлыг chunk_size мөртэй DataFrame-үүдээр дараалан буцаана.
+    Index нь файл доторх мөрийн дугаар (хэсгүүдийн дунд үргэлжилсэн).
+    """
+    offset = 0
+    for chunk in READERS[file_format(path)](path, chunk_size, columns):
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+# =========================================================
+# ======================= WRITERS =========================
+# =========================================================
+def excel_value(value):
+    """Excel нүдэнд бичих утга (жагсаалтыг ", "-ээр нийлүүлнэ)"""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return ", ".join(str(v) for v in value) if len(value) else None
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+
+def append_frame(ws, df, header=False):
+    """DataFrame-ийн мөрүүдийг write-only sheet рүү нэмэх"""
+    if header:
+        ws.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        ws.append([excel_value(v) for v in row])
+
+
+def open_workbook(sheet_names):
+    """
+    Write-only workbook + {нэр: sheet}. Sheet бүр өөрийн түр файл руу
+    урсгалаар бичигддэг тул хэд хэдэн sheet-д ээлжлэн мөр нэмж болно.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    return wb, {name: wb.create_sheet(name) for name in sheet_names}
+
+
+def _write_xlsx(path, chunks, sheet_name, types):
+    wb, sheets = open_workbook([sheet_name])
+    total = 0
+    for i, chunk in enumerate(chunks):
+        append_frame(sheets[sheet_name], chunk, header=i == 0)
+        total += len(chunk)
+    wb.save(path)
+    return total
+
+
+def _write_csv(path, chunks, sheet_name, types):
+    total = 0
+    # хэсэг ирэхгүй бол ч өмнөх ажиллуулалтын файлыг хоосоноор солино
+    pd.DataFrame(columns=list(types)).to_csv(path, index=False, encoding="utf-8-sig")
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(
+            path,
+            mode="w" if i == 0 else "a",
+            header=i == 0,
+            index=False,
+            encoding="utf-8-sig" if i == 0 else "utf-8"
+        )
+        total += len(chunk)
+    return total
+
+
+def _parquet_schema(table, types):
+    """
+    Эхний хэсгээс гаргасан schema-г засах: types-д заасан баганууд,
+    бүхэлдээ хоосон (null) баганыг string болгоно.
+    """
+    import pyarrow as pa
+
+    fields = []
+    for field in table.schema:
+        if field.name in types:
+            field = field.with_type(ARROW_TYPES[types[field.name]](pa))
+        elif pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        elif pa.types.is_list(field.type) and pa.types.is_null(field.type.value_type):
+            field = field.with_type(pa.list_(pa.string()))
+        fields.append(field)
+    return pa.schema(fields)
+
+
+def _is_listlike(value):
+    return isinstance(value, (list, tuple, dict, np.ndarray))
+
+
+def _as_text(series):
+    """Скаляр утгуудыг string болгох (null хэвээр)"""
+    def text(value):
+        if value is None or value is pd.NaT or isinstance(value, str):
+            return value
+        if isinstance(value, float) and math.isnan(value):
+            return None
+        return str(value)
+    return series.map(text).astype(object)
+
+
+def _text_objects(chunk, types):
+    """
+    openpyxl-ийн холимог (['a', 5] гэх мэт) object баганыг string болгоно:
+    Arrow ийм баганаас төрөл гаргаж чадахгүй. Жагсаалттай, types-д
+    заасан баганад хүрэхгүй.
+    """
+    for name in chunk.columns:
+        series = chunk[name]
+        if name in types or series.dtype != object:
+            continue
+        if pd.api.types.infer_dtype(series, skipna=True).startswith("mixed") \
+                and not any(_is_listlike(v) for v in series):
+            chunk[name] = _as_text(series)
+    return chunk
+
+
+def _conform(pa, chunk, schema):
+    """
+    Хэсгийг файлын schema-д оруулах: (table, []) эсвэл тохирохгүй
+    (эхний хэсгээс өөр төрөлтэй болсон) баганууд (None, [нэр, ...]).
+    String багана бол утгыг нь string болгоод дахин оролдоно.
+    """
+    arrays = []
+    widen = []
+    for field in schema:
+        series = chunk[field.name]
+        if not len(series):
+            # хоосон хэсгийн dtype (ихэвчлэн float64) ямар ч төрөлд орно
+            arrays.append(pa.array([], type=field.type))
+            continue
+        try:
+            arrays.append(pa.Array.from_pandas(series, type=field.type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            if pa.types.is_string(field.type):
+                arrays.append(pa.Array.from_pandas(_as_text(series), type=field.type))
+            elif field.name in widen or pa.types.is_nested(field.type):
+                raise
+            else:
+                widen.append(field.name)
+    if widen:
+        return None, widen
+    return pa.Table.from_arrays(arrays, schema=schema), []
+
+
+def _rewrite_widened(pa, pq, tmp, schema):
+    """
+    Өмнө бичсэн мөрүүдийг шинэ (string болгосон баганатай) schema-аар
+    хэсэгчлэн дахин бичнэ. Шинэ writer-ийг буцаана.
+    """
+    old = tmp + ".old"
+    os.replace(tmp, old)
+    writer = pq.ParquetWriter(tmp, schema)
+    try:
+        for batch in pq.ParquetFile(old).iter_batches():
+            table, _ = _conform(pa, batch.to_pandas(), schema)
+            writer.write_table(table)
+    except BaseException:
+        writer.close()
+        raise
+    finally:
+        os.remove(old)
+    return writer
+
+
+def _write_parquet(path, chunks, sheet_name, types):
+    """
+    Schema-г эхний хэсгээс гаргана. Дараагийн хэсэгт багана өөр төрөлтэй
+    болбол (int → "abc", огноо → текст) тэр баганыг string болгож өмнөх
+    мөрүүдийг дахин бичнэ. Түр файлд бичээд амжилттай дуусвал л path-ийг
+    солино - тасалдвал хагас файл үлдэхгүй.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tmp = path + ".tmp"
+    writer = None
+    total = 0
+    try:
+        for chunk in chunks:
+            chunk = _text_objects(chunk, types)
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(tmp, _parquet_schema(table, types))
+
+            table, widen = _conform(pa, chunk, writer.schema)
+            if widen:
+                schema = pa.schema([
+                    f.with_type(pa.string()) if f.name in widen else f for f in writer.schema
+                ])
+                writer.close()
+                writer = _rewrite_widened(pa, pq, tmp, schema)
+                table, _ = _conform(pa, chunk, schema)
+
+            writer.write_table(table)
+            total += len(chunk)
+
+        if writer is None:
+            # Хэсэг огт ирээгүй: types-ийн багануудтай хоосон файл бичнэ
+            # (хуучин ажиллуулалтын path үлдэхгүй)
+            writer = pq.ParquetWriter(tmp, pa.schema([
+                (name, ARROW_TYPES[t](pa)) for name, t in types.items()
+            ]))
+        writer.close()
+        writer = None
+        os.replace(tmp, path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return total
+
+
+WRITERS = {"xlsx": _write_xlsx, "csv": _write_csv, "parquet": _write_parquet}
+
+
+def write_chunks(path, chunks, sheet_name="Sheet1", types=None):
+    """
+    DataFrame-үүдийн урсгалыг нэг файл руу дараалан бичих.
+    types: {багана: "list<string>", ...} Parquet-д тогтмол төрөл өгөх
+    Нийт бичсэн мөрийн тоог буцаана.
+    """
+    return WRITERS[file_format(path)](path, chunks, sheet_name, types or {})
+
+
+def export_excel(src, dst, chunk_size=CHUNK_SIZE, sheet_name="Sheet1"):
+    """Parquet/CSV үр дүнг хүнд зориулж Excel рүү хөрвүүлэх"""
+    return write_chunks(dst, iter_post_chunks(src, chunk_size), sheet_name)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Скриптүүд шиг: DataProcessing/ болон Phone_structure/ доторх модулиудыг шууд import хийнэ
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "Phone_structure"))
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from extract_phones import (
+    REASON_IP, REASON_LONG, REASON_NINE_TRIMMED, REASON_NINE_UNKNOWN, REASON_TEN_BANK,
+    extract_column, extract_phone_columns, process_row, scan_phones,
+)
+
+# scan_phones / extract_column нь process_row (анхны олон дамжилттай хувилбар)-той
+# мөр бүр дээр яг ижил (утас, сэжигтэй) үр дүн өгөх ёстой.
+
+FIXTURES = [
+    None,
+    "",
+    "Зарна. Утас: 99112233",
+    "Холбогдох утас 9911-2233, 8811 2233 эсвэл +976 88112233",
+    "99 11 22 33 / 95•11•22•33 / 5511 223344",
+    "Хаяг: Баянзүрх дүүрэг, 13-р хороо. Утас 99o1l2233, 9O112233",
+    "IP 192.168.1.10 болон 10.0.0.1-ээс хандсан 99112233",
+    "Серверийн хаяг 8.8.8.8, утас 88.11.22.33",
+    "2024.05.12-нд нийтэлсэн, 2024-05-12 11:30, 12.05.2024",
+    "Данс 5000123456 (Хаан банк), 991122334, 123456789, 1234567890",
+    "Код 123456789012345678901234 болон 99112233000000000000",
+    "Утас 99000000, 88100000, 99110000",
+    "https://shop.mn/product/99112233 болон shop.mn/product/ 88112233",
+    "Үнэ 1,200,000₮, талбай 45.5 м², 3 өрөө",
+    "ooo OOO o0o 0o0",
+    "+97699112233 +976-88112233 976 99112233",
+    "  99112233\n88112233\t77112233  ",
+]
+
+WORDS = ["утас", "зарна", "Баянзүрх", "үнэ", "хаяг", "Oyu", "шинэ", "http://a.mn/x", "shop.mn/product/", "+976", "976"]
+SEPARATORS = ["", " ", "  ", "-", " - ", ".", "•", "\t", "\n", ", ", "/", "o", "O"]
+
+
+def digit_run(rng):
+    # Утас, IP, огноо, урт тоо, эсвэл дурын урттай цифрийн хэсэг
+    kind = rng.randrange(6)
+    if kind == 0:
+        return rng.choice("56789") + "".join(rng.choice("0123456789o") for _ in range(7))
+    if kind == 1:
+        return ".".join(str(rng.randrange(300)) for _ in range(rng.choice((3, 4, 5))))
+    if kind == 2:
+        return rng.choice(("{:04d}.{:02d}.{:02d}", "{:04d}-{:02d}-{:02d}", "{2:02d}.{1:02d}.{0:04d}")).format(
+            rng.randrange(1990, 2030), rng.randrange(1, 13), rng.randrange(1, 32)
+        )
+    if kind == 3:
+        return "".join(rng.choice("0123456789") for _ in range(rng.randint(16, 26)))
+    return "".join(rng.choice("0123456789") for _ in range(rng.randint(1, 11)))
+
+
+def generated(count=3000, seed=13):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(0, 8)):
+            parts.append(digit_run(rng) if rng.random() < 0.6 else rng.choice(WORDS))
+            parts.append(rng.choice(SEPARATORS))
+        texts.append("".join(parts))
+    return texts
+
+
+@pytest.mark.parametrize("content", FIXTURES)
+def test_scan_phones_matches_process_row_on_fixtures(content):
+    assert scan_phones(content) == process_row(content)
+
+
+def test_scan_phones_matches_process_row_on_generated():
+    mismatches = [c for c in generated() if scan_phones(c) != process_row(c)]
+    assert mismatches == []
+
+
+def test_extract_column_matches_process_row():
+    contents = FIXTURES + generated(seed=7)
+    expected = [process_row(c) for c in contents]
+    assert extract_column(contents) == expected
+    assert extract_phone_columns(contents, workers=1) == expected
+
+
+def test_fixtures_cover_masks():
+    # Харьцуулалт утгагүй болохгүйн тулд fixture-ууд бүх замыг дайрсан эсэх
+    results = [process_row(c) for c in FIXTURES]
+    reasons = {s["reason"] for _, suspicious in results for s in suspicious}
+    assert sum(len(phones) for phones, _ in results) > 10
+    assert {REASON_IP, REASON_LONG, REASON_NINE_TRIMMED, REASON_NINE_UNKNOWN, REASON_TEN_BANK} <= reasons
+    # Үүсгэсэн мөрүүдийн нэлээд хэсэг нь утас агуулна
+    assert sum(bool(process_row(c)[0]) for c in generated()) > 1000
@@ -0,0 +1,60 @@
+import pandas as pd
+import pyarrow.parquet as pq
+from openpyxl import Workbook, load_workbook
+
+from post_io import iter_post_chunks, write_chunks, export_excel
+
+TYPES = {"matched_locations": "list<string>"}
+
+
+def header_only_xlsx(path):
+    wb = Workbook()
+    wb.active.append(["ID", "Content"])
+    wb.save(path)
+
+
+def stale_output(path):
+    write_chunks(path, [pd.DataFrame({"ID": [1], "Content": ["өмнөх"], "matched_locations": [["Зайсан"]]})], types=TYPES)
+
+
+def matched(chunks):
+    for chunk in chunks:
+        chunk["matched_locations"] = [[] for _ in range(len(chunk))]
+        yield chunk
+
+
+def test_header_only_xlsx_replaces_stale_parquet(tmp_path):
+    src, out, excel = str(tmp_path / "posts.xlsx"), str(tmp_path / "out.parquet"), str(tmp_path / "out.xlsx")
+    header_only_xlsx(src)
+    stale_output(out)
+
+    assert write_chunks(out, matched(iter_post_chunks(src)), types=TYPES) == 0
+
+    table = pq.read_table(out)
+    assert table.num_rows == 0
+    assert table.schema.names == ["ID", "Content", "matched_locations"]
+    assert str(table.schema.field("matched_locations").type) == "list<element: string>"
+
+    # хоосон parquet-ээс Excel экспорт: толгой мөр л
+    assert export_excel(out, excel) == 0
+    rows = list(load_workbook(excel).active.iter_rows(values_only=True))
+    assert rows == [("ID", "Content", "matched_locations")]
+
+
+def test_no_chunks_writes_empty_files(tmp_path):
+    for name in ("out.parquet", "out.csv"):
+        path = str(tmp_path / name)
+        stale_output(path)
+        assert write_chunks(path, iter([]), types=TYPES) == 0
+        frame = next(iter_post_chunks(path))
+        assert len(frame) == 0
+        assert list(frame.columns) == ["matched_locations"]
+
+
+def test_header_only_csv(tmp_path):
+    src, out = tmp_path / "posts.csv", str(tmp_path / "out.parquet")
+    src.write_text("ID,Content\n", encoding="utf-8")
+    stale_output(out)
+
+    assert write_chunks(out, matched(iter_post_chunks(str(src))), types=TYPES) == 0
+    assert pq.read_table(out).schema.names == ["ID", "Content", "matched_locations"]